@@ -0,0 +1,110 @@
+"""Headless microbenchmarks of the game's hot paths.
+
+Usage:
+    python -m benchmarks [--output results.json] [--baseline benchmarks/baseline.json] [--threshold 0.2]
+"""
+import json
+import time
+import timeit
+import platform
+import statistics
+from dataclasses import dataclass, asdict
+from typing import Callable
+
+import pygame
+
+# A benchmark setup prepares its objects and returns the function to time
+Setup = Callable[[], Callable[[], object]]
+
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: Setup
+    # Calls per timing, None to pick one that takes at least 0.2 seconds
+    number: int | None = None
+    repeat: int = 5
+
+
+@dataclass
+class Result:
+    name: str
+    number: int
+    repeat: int
+    min_us: float
+    median_us: float
+    mean_us: float
+
+
+registry: dict[str, Benchmark] = {}
+
+
+def benchmark(name: str | None = None, number: int | None = None, repeat: int = 5):
+    """Register a setup function as a benchmark"""
+    def register(setup: Setup) -> Setup:
+        bench_name = name or setup.__name__
+        registry[bench_name] = Benchmark(bench_name, setup, number, repeat)
+        return setup
+    return register
+
+
+def run_benchmark(bench: Benchmark) -> Result:
+    fn = bench.setup()
+    timer = timeit.Timer(fn)
+    number = bench.number
+    if number is None:
+        number, _ = timer.autorange()
+    # Per call time of each repeat in microseconds
+    times = [t / number * 1e6 for t in timer.repeat(bench.repeat, number)]
+    return Result(bench.name, number, bench.repeat, min(times),
+                  statistics.median(times), statistics.mean(times))
+
+
+def run(names: list[str] | None = None) -> list[Result]:
+    results = []
+    for name, bench in registry.items():
+        if names and not any(pattern in name for pattern in names):
+            continue
+        result = run_benchmark(bench)
+        print(f"{name:<40}{result.min_us:>14.1f} us  (median {result.median_us:.1f}, x{result.number})")
+        results.append(result)
+    return results
+
+
+def save(results: list[Result], file_name: str):
+    data = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+        },
+        "results": {result.name: asdict(result) for result in results},
+    }
+    with open(file_name, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def compare(results: list[Result], baseline_file_name: str, threshold: float) -> list[str]:
+    """Compare the minimum times against a baseline
+
+    Args:
+        results (list[Result]): Results of this run
+        baseline_file_name (str): JSON file written by `save`
+        threshold (float): Allowed slowdown, 0.2 fails a benchmark more than 20% slower
+
+    Returns:
+        list[str]: Names of the benchmarks that regressed
+    """
+    with open(baseline_file_name) as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    for result in results:
+        if result.name not in baseline:
+            continue
+        ratio = result.min_us / baseline[result.name]["min_us"]
+        status = "REGRESSED" if ratio > 1 + threshold else "ok"
+        print(f"{result.name:<40}{ratio:>8.2f}x  {status}")
+        if ratio > 1 + threshold:
+            regressions.append(result.name)
+    return regressions
@@ -0,0 +1,54 @@
+import os
+import sys
+import argparse
+
+import pygame
+
+from chulalife.screen import init_display
+from . import registry, run, save, compare
+from . import cases  # noqa: F401, registers the benchmarks
+
+default_baseline = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Run the headless microbenchmarks")
+    parser.add_argument("names", nargs="*",
+                        help="Only run the benchmarks whose name contains one of these")
+    parser.add_argument("--output", "-o", default="benchmark-results.json",
+                        help="JSON file to write the results to")
+    parser.add_argument("--baseline", "-b", default=default_baseline,
+                        help="Results to compare against, skipped if the file doesn't exist")
+    parser.add_argument("--threshold", "-t", type=float, default=0.2,
+                        help="Allowed slowdown against the baseline, 0.2 is 20%%")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Write the results to the baseline instead of comparing")
+    parser.add_argument("--list", action="store_true",
+                        help="List the benchmarks and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(registry))
+        return 0
+
+    init_display(headless=True)
+    pygame.init()
+    results = run(args.names)
+    if args.save_baseline:
+        save(results, args.baseline)
+        print(f"Saved baseline {args.baseline}")
+        return 0
+    save(results, args.output)
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create one")
+        return 0
+    regressions = compare(results, args.baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} benchmarks regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
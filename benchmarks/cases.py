@@ -0,0 +1,166 @@
+from itertools import cycle
+from pygame.rect import Rect
+
+from chulalife import levels
+from chulalife.assets import assets
+from chulalife.background import StaticBackground, WalkableTile
+from chulalife.elements import ImageButton, TextObject
+from chulalife.helper import scale_fit
+from chulalife.inputs import InputFrame, inputs
+from chulalife.object import WarpDoor
+from chulalife.screen import get_screen
+from chulalife.spatial import SpatialHash
+from . import benchmark
+
+
+@benchmark()
+def static_background_draw():
+    bg = StaticBackground("assets/scene/welcome/startbg.png")
+    bg.load()
+    screen = get_screen()
+    return lambda: bg.draw(screen)
+
+
+@benchmark()
+def image_button_draw():
+    button = ImageButton(
+        x=960, y=810, w=300, h=300,
+        image_filename="assets/scene/welcome/Button_normal.png",
+        hover_file_name="assets/scene/welcome/Button_big.png",
+        active_file_name="assets/scene/welcome/Button_click.png",
+        hover_scale_factor=1.3, active_scale_factor=1.25,
+        action=lambda: None)
+    screen = get_screen()
+    return lambda: button.draw(screen)
+
+
+@benchmark()
+def image_button_draw_hover():
+    button = ImageButton(
+        x=960, y=810, w=300, h=300,
+        image_filename="assets/scene/welcome/Button_normal.png",
+        hover_file_name="assets/scene/welcome/Button_big.png",
+        active_file_name="assets/scene/welcome/Button_click.png",
+        hover_scale_factor=1.3, active_scale_factor=1.25,
+        action=lambda: None)
+    # The mouse resting on the button
+    inputs.frame = InputFrame(0.0, mouse_pos=button.rect.center)
+    screen = get_screen()
+    return lambda: button.draw(screen)
+
+
+@benchmark()
+def text_object_update_text():
+    text = TextObject("", (0, 810), font_size=100, cursor=True)
+    # Typing a word one letter at a time
+    words = cycle(["a", "ap", "app", "appl", "apple"])
+    return lambda: text.update_text(next(words))
+
+
+@benchmark()
+def text_object_type_answer():
+    text = TextObject("", (0, 810), font_size=100, cursor=True)
+    # The longest answer typed letter by letter, then a letter deleted
+    answer = "MATHEMATICS"
+    words = cycle([answer[:i] for i in range(1, len(answer) + 1)] + [answer[:-1]])
+    return lambda: text.update_text(next(words))
+
+
+@benchmark()
+def text_object_update_same_text():
+    text = TextObject("Incorrect word! 2 hearts left", (0, 860), font="display", font_size=52)
+    # The question sets its notify text every frame
+    return lambda: text.update_text("Incorrect word! 2 hearts left")
+
+
+@benchmark()
+def walkable_tile_is_walkable():
+    level = levels.LevelOne(None)
+    tile = level.walkable_mask[2]
+    # A foot rect on the walkable way and one in a blocked area
+    rects = [Rect(900, 300, 110, 20), Rect(200, 500, 110, 20)]
+    return lambda: [tile.is_walkable(rect) for rect in rects]
+
+
+@benchmark()
+def level_check_interaction():
+    level = levels.LevelOne(None)
+    level.load_scene(level.current_scene)
+    # Away from every object, the common case of a frame
+    level.player.rect.topleft = (600, 600)
+    return level.check_interaction
+
+
+@benchmark()
+def level_check_interaction_many_objects():
+    level = levels.LevelOne(None)
+    # A crowded scene, 920 warp doors away from the player, past the size where the spatial index scans every rect
+    level.objects[0] = [WarpDoor((x * 48, y * 27), (20, 10), 1)
+                        for x in range(40) for y in range(40) if x > 16]
+    level.load_scene(level.current_scene)
+    level.player.rect.topleft = (100, 600)
+    return level.check_interaction
+
+
+@benchmark()
+def object_rect():
+    level = levels.LevelOne(None)
+    level.load_scene(level.current_scene)
+    objects = level.objects[level.current_scene]
+    # Read by the renderer for every object and frame
+    return lambda: [obj.rect for obj in objects]
+
+
+@benchmark()
+def helper_scale_fit():
+    image = assets.load("assets/characters/bunny/face-down.png")
+    rect = Rect(0, 0, 225, 225)
+    return lambda: scale_fit(image, rect)
+
+
+def level_construction(level_class: type[levels.Level]):
+    def construct():
+        # Start from an empty cache to include decoding the first scene
+        assets.clear()
+        level = level_class(None)
+        level.load_scene(level.current_scene)
+        return level
+    return lambda: construct
+
+
+for level_class in (levels.LevelOne, levels.LevelTwo, levels.LevelThree, levels.LevelFour, levels.LevelFive):
+    benchmark(f"level_construction[{level_class.__name__}]", number=1)(
+        level_construction(level_class))
+
+
+@benchmark()
+def walkable_tile_is_walkable_many_blockers():
+    # A big custom map, a 20 x 20 grid of small blockers
+    tile = WalkableTile([Rect(x * 96 + 40, y * 54 + 20, 30, 20)
+                         for x in range(20) for y in range(20)])
+    rects = [Rect(900, 300, 110, 20), Rect(200, 500, 110, 20)]
+    return lambda: [tile.is_walkable(rect) for rect in rects]
+
+
+@benchmark()
+def walkable_tile_is_walkable_huge_map():
+    # 4000 blockers checked through their spatial index, past the size where it scans every rect
+    tile = WalkableTile([Rect(x * 30 + 10, y * 17 + 5, 10, 6)
+                         for x in range(64) for y in range(63)], compile_mask=False)
+    rects = [Rect(900, 300, 110, 20), Rect(200, 500, 110, 20)]
+    return lambda: [tile.is_walkable(rect) for rect in rects]
+
+
+def spatial_hash_query(scan: bool):
+    # 2048 small rects spread over the scene, past the size where the index uses its grid
+    index = SpatialHash.of((Rect(x * 30 + 10, y * 33 + 5, 12, 8), (x, y))
+                           for x in range(64) for y in range(32))
+    if scan:
+        index.linear_limit = len(index) + 1
+    # Foot rects of the player in a few places
+    rects = [Rect(900, 300, 110, 20), Rect(200, 500, 110, 20), Rect(1500, 900, 110, 20)]
+    return lambda: [index.query(rect) for rect in rects]
+
+
+benchmark("spatial_hash_query_grid")(lambda: spatial_hash_query(scan=False))
+benchmark("spatial_hash_query_scan")(lambda: spatial_hash_query(scan=True))
@@ -0,0 +1,255 @@
+"""End-to-end benchmark replaying a full playthrough of the game headless.
+
+A scripted player clicks start, walks to every quest character, types the
+answers and walks through the warp doors until the end screen. Its input is
+recorded once and the recording is replayed as fast as possible to measure
+the frame times and the time taken by each level switch.
+
+Usage:
+    python -m benchmarks.playthrough [--recording FILE] [--rerecord] [--output playthrough-results.json]
+"""
+import os
+import json
+import time
+import argparse
+from collections import deque
+from typing import Callable
+
+import pygame
+from pygame.rect import Rect
+
+from chulalife.game import Game
+from chulalife.game_state import game_state
+from chulalife.assets import assets
+from chulalife.inputs import InputFrame, inputs, key_scancode, load_recording, pressed_keys
+from chulalife.levels import EndGame, Level
+from chulalife.object import QuestCharacter, WarpDoor
+from chulalife.profiler import percentile
+from chulalife.scheduler import scheduler
+from chulalife.screen import WIDTH, HEIGHT
+from chulalife.setting import initial_hearts, update_rate
+
+default_recording = os.path.join(os.path.dirname(__file__), "playthrough.rec.gz")
+
+DIRECTIONS = {
+    pygame.K_LEFT: (-1, 0),
+    pygame.K_RIGHT: (1, 0),
+    pygame.K_UP: (0, -1),
+    pygame.K_DOWN: (0, 1),
+}
+
+
+class PlaythroughBot:
+    """
+    Input source playing the game from start to end, see `Inputs.drive`.
+
+    Every frame it looks at the current level and returns the input of one
+    simulation step: a click on the button of menu screens, the next letter
+    of the answer while a question is open, or the arrow key of the next move
+    on the shortest walkable path to the next quest character or warp door.
+    """
+
+    def __init__(self, game: Game, max_frames: int = 50000) -> None:
+        self.game = game
+        self.max_frames = max_frames
+        self.frames = 0
+        self.step = 1 / update_rate
+        self.path: list[tuple[int, tuple[int, int]]] = []
+
+    def __call__(self, dt: float) -> InputFrame | None:
+        self.frames += 1
+        if self.frames > self.max_frames:
+            raise RuntimeError(
+                f"Playthrough stuck in {type(self.game.level).__name__}")
+        level = self.game.level
+        if isinstance(level, EndGame):
+            return InputFrame(self.step, [pygame.event.Event(pygame.QUIT)])
+        if level.player is None:
+            return self.click(level.buttons[0].rect.center)
+        question = level.overlay.get_element("question")
+        if question is not None and level.overlay.is_fullscreen_open:
+            if question.status == "active":
+                return self.type_answer(question)
+            # Waiting for the level to close the question
+            return InputFrame(self.step)
+        return self.walk(level)
+
+    def click(self, pos: tuple[int, int]) -> InputFrame:
+        return InputFrame(self.step, [pygame.event.Event(
+            pygame.MOUSEBUTTONDOWN, button=1, pos=pos)], mouse_pos=pos)
+
+    def type_answer(self, question) -> InputFrame:
+        if question.typed_word == question.correct_word:
+            event = pygame.event.Event(
+                pygame.KEYDOWN, key=pygame.K_RETURN, unicode="\r", mod=0)
+        else:
+            letter = question.correct_word[len(question.typed_word)]
+            key = pygame.K_MINUS if letter == "-" else ord(letter.lower())
+            event = pygame.event.Event(
+                pygame.KEYDOWN, key=key, unicode=letter.lower(), mod=0)
+        return InputFrame(self.step, [event])
+
+    def walk(self, level: Level) -> InputFrame:
+        position = level.player.rect.topleft
+        # Plan again once a target is reached or a move didn't end where planned
+        if len(self.path) < 2 or self.path[0][1] != position:
+            self.path = self.find_path(level)
+        if len(self.path) < 2:
+            return InputFrame(self.step)
+        self.path.pop(0)
+        key = self.path[0][0]
+        return InputFrame(self.step, keys=pressed_keys([key_scancode(key)]))
+
+    def target(self, level: Level) -> Rect:
+        objects = level.objects[level.current_scene]
+        for obj in objects:
+            if isinstance(obj, QuestCharacter) and not obj.done:
+                return obj.rect
+        doors = [obj for obj in objects if isinstance(obj, WarpDoor)]
+        # A door leaving the level, otherwise the one to the furthest scene
+        door = max(doors, key=lambda door: (
+            door.action is not None, door.warpTarget))
+        return door.rect
+
+    def find_path(self, level: Level) -> list[tuple[int, tuple[int, int]]]:
+        """Breadth first search of player positions one step apart, returns (key, position) pairs"""
+        player = level.player
+        target = self.target(level)
+        # Touching any other door or character would interrupt the walk
+        obstacles = [obj.rect for obj in level.objects[level.current_scene]
+                     if obj.rect != target and (isinstance(obj, WarpDoor) or
+                                                (isinstance(obj, QuestCharacter) and not obj.done))]
+        mask = level.walkable_mask[level.current_scene] if level.walkable_mask else None
+        size = player.rect.size
+        start = player.rect.topleft
+        previous: dict[tuple[int, int], tuple[int, tuple[int, int]] | None] = {
+            start: None}
+        queue = deque([start])
+        while queue:
+            position = queue.popleft()
+            rect = Rect(position, size)
+            if rect.colliderect(target):
+                path = []
+                while previous[position] is not None:
+                    key, before = previous[position]
+                    path.append((key, position))
+                    position = before
+                return [(0, start)] + path[::-1]
+            for key, (dx, dy) in DIRECTIONS.items():
+                moved = rect.move(dx * player.speed, dy * player.speed)
+                if moved.topleft in previous or moved.left < 0 or moved.top < 0 \
+                        or moved.right > WIDTH or moved.bottom > HEIGHT:
+                    continue
+                if mask is not None and not mask.is_walkable(player.to_foot_rect(moved)):
+                    continue
+                if moved.collidelist(obstacles) != -1:
+                    continue
+                previous[moved.topleft] = (key, position)
+                queue.append(moved.topleft)
+        raise RuntimeError(
+            f"No path to {target} in {type(level).__name__} scene {level.current_scene}")
+
+
+class TimedGame(Game):
+    """Game keeping how long each level switch took"""
+
+    def __init__(self) -> None:
+        self.load_times: list[tuple[str, float]] = []
+        super().__init__(headless=True)
+
+    def switch_level(self, level):
+        start = time.perf_counter()
+        super().switch_level(level)
+        self.load_times.append(
+            (type(self.level).__name__, time.perf_counter() - start))
+
+
+def new_game() -> TimedGame:
+    game_state.hearts = initial_hearts
+    assets.clear()
+    scheduler.clear()
+    game = TimedGame()
+    # Run as fast as possible
+    game.fps = 0
+    return game
+
+
+def record(file_name: str) -> int:
+    """Play the game with the bot and record its input"""
+    game = new_game()
+    bot = PlaythroughBot(game)
+    inputs.drive(bot)
+    inputs.start_recording()
+    game.run()
+    inputs.save(file_name)
+    inputs.recording = None
+    inputs.live()
+    return bot.frames
+
+
+def timed(source: Callable[[float], InputFrame | None], times: list[float]):
+    """Wrap an input source to keep the time each frame is polled"""
+    def poll(dt: float) -> InputFrame | None:
+        times.append(time.perf_counter())
+        return source(dt)
+    return poll
+
+
+def replay(file_name: str) -> dict:
+    """Replay a recording as fast as possible and measure it"""
+    start = time.perf_counter()
+    game = new_game()
+    startup_s = time.perf_counter() - start
+    frames = iter(load_recording(file_name))
+    poll_times: list[float] = []
+    inputs.drive(timed(lambda dt: next(frames, None), poll_times))
+    game.run()
+    inputs.live()
+
+    frame_ms = sorted((end - start) * 1000
+                      for start, end in zip(poll_times, poll_times[1:]))
+    return {
+        "frames": len(frame_ms),
+        "total_s": poll_times[-1] - poll_times[0],
+        "startup_s": startup_s,
+        # The second poll comes once the first frame is presented
+        "first_frame_s": poll_times[1] - start,
+        "frame_ms": {
+            "p50": percentile(frame_ms, 50),
+            "p95": percentile(frame_ms, 95),
+            "p99": percentile(frame_ms, 99),
+            "max": frame_ms[-1],
+        },
+        "level_load_ms": [[name, seconds * 1000] for name, seconds in game.load_times],
+        "reached": type(game.level).__name__,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.playthrough", description="Replay a full playthrough headless")
+    parser.add_argument("--recording", "-r", default=default_recording,
+                        help="Input recording to replay, recorded with the scripted player if missing")
+    parser.add_argument("--rerecord", action="store_true",
+                        help="Record the scripted player again")
+    parser.add_argument("--output", "-o", default="playthrough-results.json",
+                        help="JSON file to write the results to")
+    args = parser.parse_args(argv)
+
+    if args.rerecord or not os.path.exists(args.recording):
+        frames = record(args.recording)
+        print(f"Recorded {frames} frames to {args.recording}")
+    results = replay(args.recording)
+
+    print(f"Reached {results['reached']} in {results['frames']} frames, {results['total_s']:.2f} s")
+    print(f"Startup {results['startup_s']:.3f} s, first frame after {results['first_frame_s']:.3f} s")
+    print("Frame time ms: " + ", ".join(
+        f"{name} {value:.2f}" for name, value in results["frame_ms"].items()))
+    for name, ms in results["level_load_ms"]:
+        print(f"  {name:<16}{ms:>10.1f} ms")
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
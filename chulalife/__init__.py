@@ -0,0 +1,4 @@
+import time
+
+# When the package was first imported, the start of the time to the first frame
+started = time.perf_counter()
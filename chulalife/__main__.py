@@ -1,5 +1,23 @@
+import argparse
 from .game import Game
+from .inputs import inputs
+from .setting import headless
 
 if __name__ == "__main__":
-    game = Game()
+    parser = argparse.ArgumentParser(prog="python -m chulalife")
+    parser.add_argument("--headless", action="store_true", default=headless,
+                        help="Run without a window")
+    parser.add_argument("--record", metavar="FILE",
+                        help="Record the keyboard and mouse input to a file")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="Play a recorded input file instead of the keyboard and mouse")
+    args = parser.parse_args()
+
+    game = Game(headless=args.headless)
+    if args.replay:
+        inputs.replay(args.replay)
+    if args.record:
+        inputs.start_recording()
     game.run()
+    if args.record:
+        inputs.save(args.record)
@@ -0,0 +1,215 @@
+import struct
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Hashable, Literal
+from pygame.surface import Surface
+from pygame.rect import Rect
+from pygame.image import load
+from pygame.transform import scale
+
+# Internal imports
+from .helper import fit_size
+from .setting import asset_cache_budget
+from .logger import get_logger
+
+if TYPE_CHECKING:
+    from .atlas import Atlas
+
+logger = get_logger(__name__)
+
+ConvertMode = Literal["alpha", "opaque", "none"]
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def surface_bytes(surface: Surface) -> int:
+    """Number of bytes used by the pixels of a surface, subsurfaces only count their own area"""
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+
+def png_size(path: str) -> tuple[int, int] | None:
+    """Size of a PNG image from its header, None when the file isn't a PNG"""
+    with open(path, "rb") as f:
+        header = f.read(24)
+    # The 8 byte signature, then the IHDR chunk starting with the width and height
+    if len(header) < 24 or header[:8] != PNG_SIGNATURE or header[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", header[16:24])
+
+
+class AssetManager:
+    """
+    A shared cache of decoded and scaled surfaces.
+
+    Surfaces are cached by (path, target size, convert mode) so that every
+    consumer loading the same image at the same size shares one surface.
+    Least recently used entries are evicted once the cached surfaces use more
+    than `budget` bytes.
+
+    Cached surfaces are shared, callers must copy a surface before drawing on it.
+    The cache is safe to use from worker threads, images are decoded outside
+    the lock and concurrent loads of the same key wait for the first one.
+
+    Scaled images packed in an atlas (see `chulalife.atlas`) are served as
+    subsurfaces of the atlas image instead of being decoded from their file.
+
+    Args:
+        budget (int): Maximum number of bytes of cached surfaces.
+
+    Methods:
+        load(path, size, convert): Load an image, optionally scaled to size
+        load_fit(path, rect, convert): Load an image scaled to fit the rect
+        image_size(path): Original size of an image
+        add_atlas(atlas): Serve the sprites of an atlas from its image
+        cached(key, factory): Cache a surface derived from other assets
+        stats(): Hit/miss counters and memory usage of the cache
+        surfaces(): The cached surfaces
+    """
+
+    def __init__(self, budget: int = asset_cache_budget) -> None:
+        self.budget = budget
+        self._surfaces: OrderedDict[Hashable, Surface] = OrderedDict()
+        self._loading: dict[Hashable, threading.Event] = {}
+        self._lock = threading.RLock()
+        self._atlases: dict[tuple[str, tuple[int, int]], "Atlas"] = {}
+        self._image_sizes: dict[str, tuple[int, int]] = {}
+        # Set to a set to collect the keys of every load, used by the bake command
+        self.record: set[tuple] | None = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def load(self, path: str, size: tuple[float, float] | None = None, convert: ConvertMode = "alpha") -> Surface:
+        """Load an image from the cache, decoding it on a miss.
+
+        Args:
+            path (str): Image file to load
+            size (tuple[float, float] | None, optional): Size to scale the image to.
+                Defaults to None to keep the original size.
+            convert (ConvertMode, optional): "alpha" for `convert_alpha`, "opaque" for `convert`
+                or "none" to keep the file pixel format. Defaults to "alpha".
+
+        Returns:
+            Surface: The shared cached surface
+        """
+        if size is not None:
+            size = (int(size[0]), int(size[1]))
+        if self.record is not None:
+            self.record.add((path, size, convert))
+        if size is None:
+            return self.cached((path, None, convert), lambda: self._decode(path, convert))
+
+        atlas = self._atlases.get((path, size)) if convert == "alpha" else None
+        if atlas is not None:
+            return self.cached((path, size, convert), lambda: atlas.subsurface(
+                self.load(atlas.image_file_name), path, size))
+
+        def load_scaled():
+            # The original isn't cached, it would take as much room again next to the scaled image
+            original = self._decode(path, convert)
+            return original if original.get_size() == size else scale(original, size)
+        return self.cached((path, size, convert), load_scaled)
+
+    def load_fit(self, path: str, rect: Rect, convert: ConvertMode = "alpha") -> tuple[Surface, Rect]:
+        """Load an image scaled to fit the rect while maintaining the aspect ratio
+
+        Args:
+            path (str): Image file to load
+            rect (Rect): surface to fit into
+            convert (ConvertMode, optional): See `load`. Defaults to "alpha".
+
+        Returns:
+            tuple[Surface, Rect]: scaled image and its rect
+        """
+        surface = self.load(path, fit_size(self.image_size(path), rect), convert)
+        return surface, surface.get_rect(center=rect.center)
+
+    def image_size(self, path: str) -> tuple[int, int]:
+        """Original size of an image, read from the atlas or the PNG header without decoding it"""
+        size = self._image_sizes.get(path)
+        if size is None:
+            size = png_size(path)
+            if size is None:
+                # Not a PNG, decoded only for its size
+                size = load(path).get_size()
+            self._image_sizes[path] = size
+        return size
+
+    def add_atlas(self, atlas: "Atlas"):
+        with self._lock:
+            for key in atlas.rects:
+                self._atlases[key] = atlas
+            self._image_sizes.update(atlas.source_sizes)
+
+    def cached(self, key: Hashable, factory: Callable[[], Surface]) -> Surface:
+        """Return the surface cached under key, creating it with factory on a miss"""
+        while True:
+            with self._lock:
+                surface = self._get(key)
+                if surface is not None:
+                    return surface
+                loading = self._loading.get(key)
+                if loading is None:
+                    self._loading[key] = threading.Event()
+                    break
+            # Another thread is creating it, retry once it's done
+            loading.wait()
+        try:
+            surface = factory()
+            with self._lock:
+                return self._put(key, surface)
+        finally:
+            with self._lock:
+                self._loading.pop(key).set()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._surfaces),
+                "bytes": self.bytes,
+                "budget": self.budget,
+            }
+
+    def surfaces(self) -> list[Surface]:
+        with self._lock:
+            return list(self._surfaces.values())
+
+    def clear(self):
+        with self._lock:
+            self._surfaces.clear()
+            self.bytes = 0
+
+    def _decode(self, path: str, convert: ConvertMode) -> Surface:
+        logger.debug(f"Decoding {path}")
+        surface = load(path)
+        if convert == "alpha":
+            return surface.convert_alpha()
+        if convert == "opaque":
+            return surface.convert()
+        return surface
+
+    def _get(self, key: Hashable) -> Surface | None:
+        surface = self._surfaces.get(key)
+        if surface is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._surfaces.move_to_end(key)
+        return surface
+
+    def _put(self, key: Hashable, surface: Surface) -> Surface:
+        self._surfaces[key] = surface
+        self.bytes += surface_bytes(surface)
+        # Keep the newest entry even if it alone is over the budget
+        while self.bytes > self.budget and len(self._surfaces) > 1:
+            _, evicted = self._surfaces.popitem(last=False)
+            self.bytes -= surface_bytes(evicted)
+            self.evictions += 1
+        return surface
+
+
+assets = AssetManager()
@@ -0,0 +1,152 @@
+import os
+import json
+import math
+from typing import Iterable, Sequence
+import pygame
+from pygame.rect import Rect
+from pygame.surface import Surface
+
+# Internal imports
+from .setting import baked_assets_dir
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+SpriteKey = tuple[str, tuple[int, int]]
+
+atlas_index_path = os.path.join(baked_assets_dir, "atlas.json")
+
+
+class Atlas:
+    """
+    Many small images packed into one image.
+
+    Every sprite is an image file already scaled to the size it's drawn at,
+    stored as a sub-rect of the atlas image and handed out as a subsurface,
+    so the atlas is decoded once instead of every image file.
+
+    The index is a JSON file next to the atlas image:
+
+        {"image": "atlas.png", "sprites": [
+            {"source": "assets/...png", "source_size": [w, h], "size": [w, h], "rect": [x, y, w, h]}, ...]}
+
+    Args:
+        image_file_name (str): The packed image
+        rects (dict[SpriteKey, Rect]): Sub-rect of each (source file, size) sprite
+        source_sizes (dict[str, tuple[int, int]]): Original size of each source file
+
+    Methods:
+        load(index_file_name): Read an atlas index
+        save(index_file_name): Write the atlas index
+        subsurface(surface, source, size): The sprite as a subsurface of the atlas image
+    """
+
+    def __init__(self, image_file_name: str, rects: dict[SpriteKey, Rect], source_sizes: dict[str, tuple[int, int]]) -> None:
+        self.image_file_name = image_file_name
+        self.rects = rects
+        self.source_sizes = source_sizes
+
+    def __contains__(self, key: SpriteKey) -> bool:
+        return key in self.rects
+
+    @property
+    def sources(self) -> list[str]:
+        return list(self.source_sizes)
+
+    def subsurface(self, surface: Surface, source: str, size: tuple[int, int]) -> Surface:
+        return surface.subsurface(self.rects[(source, size)])
+
+    @classmethod
+    def load(cls, index_file_name: str) -> "Atlas":
+        with open(index_file_name) as f:
+            index = json.load(f)
+        rects = {}
+        source_sizes = {}
+        for sprite in index["sprites"]:
+            rects[(sprite["source"], tuple(sprite["size"]))] = Rect(sprite["rect"])
+            source_sizes[sprite["source"]] = tuple(sprite["source_size"])
+        image_file_name = os.path.join(
+            os.path.dirname(index_file_name), index["image"])
+        return cls(image_file_name, rects, source_sizes)
+
+    def save(self, index_file_name: str):
+        index = {
+            "image": os.path.relpath(self.image_file_name, os.path.dirname(index_file_name)),
+            "sprites": [
+                {
+                    "source": source,
+                    "source_size": list(self.source_sizes[source]),
+                    "size": list(size),
+                    "rect": list(rect),
+                }
+                for (source, size), rect in self.rects.items()
+            ],
+        }
+        with open(index_file_name, "w") as f:
+            json.dump(index, f, indent=1)
+
+
+def pack(sizes: dict[SpriteKey, tuple[int, int]], padding: int = 2) -> tuple[tuple[int, int], dict[SpriteKey, Rect]]:
+    """Place sprites on rows of a power of two wide image, tallest sprites first
+
+    Args:
+        sizes (dict[SpriteKey, tuple[int, int]]): Size of each sprite
+        padding (int, optional): Gap between sprites, avoids bleeding when scaled. Defaults to 2.
+
+    Returns:
+        tuple[tuple[int, int], dict[SpriteKey, Rect]]: Size of the atlas and the rect of each sprite
+    """
+    area = sum((w + padding) * (h + padding) for w, h in sizes.values())
+    widest = max((w + padding for w, _ in sizes.values()), default=1)
+    width = 2 ** math.ceil(math.log2(max(widest, math.sqrt(area))))
+    rects = {}
+    x = y = row_height = 0
+    for key, (w, h) in sorted(sizes.items(), key=lambda item: (-item[1][1], item[0])):
+        if x + w > width:
+            x = 0
+            y += row_height + padding
+            row_height = 0
+        rects[key] = Rect(x, y, w, h)
+        x += w + padding
+        row_height = max(row_height, h)
+    return (width, y + row_height), rects
+
+
+def build_atlas(sprites: Iterable[SpriteKey], image_file_name: str, index_file_name: str) -> Atlas:
+    """Pack the sprites, loaded through the asset cache, into an atlas image and index"""
+    from .assets import assets
+
+    surfaces = {(source, size): assets.load(source, size)
+                for source, size in sprites}
+    (width, height), rects = pack(
+        {key: surface.get_size() for key, surface in surfaces.items()})
+    image = pygame.Surface((width, height), pygame.SRCALPHA)
+    for key, rect in rects.items():
+        image.blit(surfaces[key], rect)
+    os.makedirs(os.path.dirname(image_file_name), exist_ok=True)
+    pygame.image.save(image, image_file_name)
+    source_sizes = {source: assets.load(source).get_size()
+                    for source, _ in rects}
+    atlas = Atlas(image_file_name, rects, source_sizes)
+    atlas.save(index_file_name)
+    return atlas
+
+
+def load_baked_atlas(index_file_name: str = atlas_index_path) -> Atlas | None:
+    """The atlas written by `python -m chulalife.bake`, None if it's missing or stale"""
+    from .bake import is_up_to_date
+
+    if not os.path.exists(index_file_name):
+        return None
+    atlas = Atlas.load(index_file_name)
+    if not is_up_to_date(index_file_name, atlas.sources) or not os.path.exists(atlas.image_file_name):
+        logger.warning(
+            f"Ignoring outdated atlas {index_file_name}, run python -m chulalife.bake")
+        return None
+    return atlas
+
+
+def is_atlas_sprite(key: tuple[str, Sequence[int] | None, str], max_size: int = 1024) -> bool:
+    """Whether an asset cache key is a small scaled sprite worth packing"""
+    _, size, convert = key
+    return convert == "alpha" and size is not None and size[0] <= max_size and size[1] <= max_size
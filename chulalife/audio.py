@@ -0,0 +1,214 @@
+import math
+import os
+import time
+import wave
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
+import pygame
+from pygame.mixer import Channel, Sound
+
+# Internal imports
+from .bake import is_up_to_date
+from .setting import (audio_cache_dir, mixer_buffer_size, mixer_frequency, music_crossfade_time,
+                      music_volume, sfx_channels, sfx_volume)
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# Channels reserved for the music, a new track fades in on one while the old one fades out on the other
+MUSIC_CHANNELS = 2
+
+# Sound effects as notes played one after the other, (start pitch, end pitch, seconds)
+EFFECTS: dict[str, list[tuple[float, float, float]]] = {
+    "correct": [(660, 660, 0.08), (990, 990, 0.16)],
+    "wrong": [(220, 140, 0.25)],
+    "warp": [(300, 900, 0.18)],
+}
+
+
+def synthesize(notes: list[tuple[float, float, float]], frequency: int, channels: int) -> bytes:
+    """Signed 16 bit samples of sine notes, each gliding from its start to its end pitch and fading out"""
+    samples = array("h")
+    for start, end, duration in notes:
+        count = int(frequency * duration)
+        phase = 0.0
+        for i in range(count):
+            t = i / count
+            phase += 2 * math.pi * (start + (end - start) * t) / frequency
+            # Fading out to silence keeps the note from clicking when it stops
+            value = int(32767 * (1 - t) * math.sin(phase))
+            samples.extend([value] * channels)
+    return samples.tobytes()
+
+
+def cached_music_path(path: str, frequency: int, channels: int) -> str:
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(audio_cache_dir, f"{name}-{frequency}x{channels}.wav")
+
+
+def decode_music(path: str) -> Sound:
+    """Load a music file, from its uncompressed copy in the audio cache when it's up to date
+
+    A missing or stale copy is written after decoding, the next start only
+    reads the samples.
+    """
+    frequency, _, channels = pygame.mixer.get_init()
+    cached = cached_music_path(path, frequency, channels)
+    if is_up_to_date(cached, [path]):
+        return Sound(cached)
+    sound = Sound(path)
+    os.makedirs(os.path.dirname(cached), exist_ok=True)
+    # Written next to the cache file and renamed, an interrupted write doesn't leave a truncated file
+    partial = cached + ".partial"
+    with wave.open(partial, "wb") as file:
+        file.setnchannels(channels)
+        file.setsampwidth(2)
+        file.setframerate(frequency)
+        file.writeframes(sound.get_raw())
+    os.replace(partial, cached)
+    logger.info(f"Cached {path} as {cached}")
+    return sound
+
+
+class Audio:
+    """
+    Music and sound effects, decoded on a worker thread.
+
+    The game loop never waits for audio. Sound effects are synthesized
+    when the mixer starts and skipped until they're ready, music is decoded
+    when a level asks for it and starts on the first `update` after it's
+    ready, fading in while the previous track fades out. Only the tracks
+    playing, fading out or asked for stay decoded, a track played again is
+    read from the audio cache.
+
+    Sound effects play on a fixed pool of channels. When every channel is
+    busy the effect that started first is cut to play the new one.
+
+    Methods:
+        init(): Start the mixer and synthesize the sound effects
+        play(name): Play a sound effect
+        play_music(path): Cross-fade to another track
+        update(): Start the track asked for once it's decoded, called every frame
+        shutdown(): Stop the worker thread before the mixer quits
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.effects: dict[str, Sound] = {}
+        self.channels: list[Channel] = []
+        # When the sound playing on each channel started, the oldest is stolen first
+        self._started: list[float] = []
+        self._executor: ThreadPoolExecutor | None = None
+        self._tracks: dict[str, Future[Sound]] = {}
+        self.music_path: str | None = None
+        # Track started last, and the one fading out until _fade_end
+        self._playing: str | None = None
+        self._fading: str | None = None
+        self._fade_end = 0.0
+        self._music_channel = 0
+        self._music_pending = False
+
+    def init(self):
+        if self.enabled and pygame.mixer.get_init():
+            return
+        try:
+            # pygame.init starts the mixer with the default buffer, start it again with ours
+            pygame.mixer.quit()
+            pygame.mixer.init(mixer_frequency, -16, 2, mixer_buffer_size)
+        except pygame.error as e:
+            logger.warning(f"Audio disabled: {e}")
+            return
+        pygame.mixer.set_num_channels(MUSIC_CHANNELS + sfx_channels)
+        # Sound.play picks from the other channels, the music channels are only used explicitly
+        pygame.mixer.set_reserved(MUSIC_CHANNELS)
+        self.channels = [Channel(i) for i in range(MUSIC_CHANNELS, MUSIC_CHANNELS + sfx_channels)]
+        self._started = [0.0] * sfx_channels
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="audio")
+        self.enabled = True
+        self._executor.submit(self._synthesize_effects)
+
+    def _synthesize_effects(self):
+        frequency, _, channels = pygame.mixer.get_init()
+        effects = {}
+        for name, notes in EFFECTS.items():
+            effects[name] = Sound(buffer=synthesize(notes, frequency, channels))
+            effects[name].set_volume(sfx_volume)
+        if self.enabled:
+            self.effects = effects
+
+    def play(self, name: str) -> Channel | None:
+        """Play a sound effect, returns the channel or None when audio is off or the effect isn't ready"""
+        sound = self.effects.get(name)
+        if not self.enabled or sound is None:
+            return None
+        index = next((i for i, channel in enumerate(self.channels) if not channel.get_busy()), None)
+        if index is None:
+            index = min(range(len(self.channels)), key=self._started.__getitem__)
+            logger.debug(f"Stealing sound channel {index} for {name}")
+        channel = self.channels[index]
+        channel.play(sound)
+        self._started[index] = time.perf_counter()
+        return channel
+
+    def play_music(self, path: str | None):
+        """Cross-fade to the track at path once it's decoded, None fades the music out"""
+        if not self.enabled or path == self.music_path:
+            return
+        self.music_path = path
+        if path is not None and path not in self._tracks:
+            self._tracks[path] = self._executor.submit(decode_music, path)
+        self._music_pending = True
+
+    def update(self):
+        if self._fading is not None and time.perf_counter() >= self._fade_end:
+            self._fading = None
+            self._evict_tracks()
+        if not self._music_pending:
+            return
+        track = None
+        if self.music_path is not None:
+            future = self._tracks[self.music_path]
+            if not future.done():
+                return
+            if future.exception() is not None:
+                logger.error(f"Loading music {self.music_path} failed: {future.exception()}")
+                del self._tracks[self.music_path]
+            else:
+                track = future.result()
+        self._music_pending = False
+        fade_ms = int(music_crossfade_time * 1000)
+        Channel(self._music_channel).fadeout(fade_ms)
+        self._fading = self._playing
+        self._fade_end = time.perf_counter() + music_crossfade_time
+        self._playing = None
+        if track is not None:
+            self._music_channel = (self._music_channel + 1) % MUSIC_CHANNELS
+            channel = Channel(self._music_channel)
+            channel.set_volume(music_volume)
+            channel.play(track, loops=-1, fade_ms=fade_ms)
+            self._playing = self.music_path
+        self._evict_tracks()
+
+    def _evict_tracks(self):
+        """Forget the decoded tracks not playing, fading out or asked for, a full track is tens of MB"""
+        keep = {self.music_path, self._playing, self._fading}
+        for path in list(self._tracks):
+            if path not in keep:
+                self._tracks.pop(path).cancel()
+
+    def shutdown(self):
+        """Forget every sound, they can't be played after pygame.quit"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self.enabled = False
+        self.effects = {}
+        self.channels = []
+        self._tracks.clear()
+        self.music_path = None
+        self._playing = None
+        self._fading = None
+        self._music_pending = False
+
+
+audio = Audio()
@@ -2,32 +2,88 @@ from typing import List, Tuple
 import pygame
 from pygame.typing import FileLike
 from pygame.surface import Surface
-from pygame.image import load
+from pygame.sprite import Sprite
 from .color import PURPLE, GREEN
-from .setting import background_debug, walkable_debug, walkable_tile_interactions
+from .setting import background_debug, walkable_debug, walkable_tile_interactions, use_baked_backgrounds, compile_walkable_masks, walkable_mask_cell_size
+from .assets import assets, ConvertMode
+from .bake import find_baked
 from .logger import get_logger
-from .screen import screen
+from .screen import get_screen, WIDTH, HEIGHT
+from .spatial import SpatialHash
+from .walkability import bounds, rasterize, mask_from_image, overlaps
 
 logger = get_logger(__name__)
 
 
-class Background:
-    def __init__(self, image_file_name: FileLike, screen=screen) -> None:
-        self.bg_image = load(image_file_name)
+class Background(Sprite):
+    """
+    A scene background made of one or more images merged on top of each other.
+
+    The images are only decoded when the background is loaded, either with
+    `load` or on the first access to `bg_image`, and `unload` releases them
+    until the scene is used again.
+    """
+
+    def __init__(self, image_file_name: FileLike, screen: Surface | None = None, convert: ConvertMode = "alpha") -> None:
+        super().__init__()
+        self.visible = True
+        self.sources = [image_file_name]
+        self.convert: ConvertMode = convert
+        self._bg_image: Surface | None = None
         self.debug = background_debug
-        self.screen = screen
+        self.screen = screen if screen is not None else get_screen()
+
+    @property
+    def bg_image(self) -> Surface:
+        if self._bg_image is None:
+            self._bg_image = self.render()
+        return self._bg_image
+
+    @bg_image.setter
+    def bg_image(self, image: Surface | None):
+        self._bg_image = image
+
+    @property
+    def image(self) -> Surface:
+        return self.bg_image
+
+    @property
+    def rect(self) -> pygame.Rect:
+        return self.bg_image.get_rect()
+
+    @property
+    def loaded(self) -> bool:
+        return self._bg_image is not None
+
+    def load(self):
+        self.bg_image
+
+    def unload(self):
+        self._bg_image = None
 
     def draw(self, screen: Surface, offset: List[int] = [0, 0]):
         logger.error("draw method not implemented")
 
     def add(self, image_file_name: FileLike) -> None:
-        # load and merge the image
-        self.bg_image = pygame.transform.scale(
-            self.bg_image, (self.screen.get_width(), self.screen.get_height()))
-        new_image = load(image_file_name)
-        new_image = pygame.transform.scale(
-            new_image, (self.screen.get_width(), self.screen.get_height()))
-        self.bg_image.blit(new_image, (0, 0))
+        self.sources.append(image_file_name)
+        self.unload()
+
+    def render(self) -> Surface:
+        # load and merge the images, the composites are shared through the asset cache
+        size = self.screen.get_size()
+        image = assets.load(self.sources[0], size, self.convert)
+        for i in range(1, len(self.sources)):
+            image = assets.cached(
+                (tuple(self.sources[:i + 1]), size, "composite"),
+                lambda base_image=image, image_file_name=self.sources[i]: self.composite(base_image, image_file_name, size))
+        return image
+
+    @staticmethod
+    def composite(base_image: Surface, image_file_name: FileLike, size: tuple[int, int]) -> Surface:
+        # scale always returns a new surface, so the cached base image is never drawn on
+        image = pygame.transform.scale(base_image, size)
+        image.blit(assets.load(image_file_name, size), (0, 0))
+        return image
 
 
 class StaticBackground(Background):
@@ -36,43 +92,101 @@ class StaticBackground(Background):
         for file_name in image_file_names:
             self.add(file_name)
 
+    def render(self) -> Surface:
+        baked_file_name = find_baked(
+            self.sources, self.screen.get_size()) if use_baked_backgrounds else None
+        if baked_file_name is not None:
+            # Already composited and scaled, only needs decoding
+            return assets.load(baked_file_name, convert="opaque")
+        return super().render()
+
     def draw(self, screen: Surface, offset: List[int] = [0, 0]):
-        self.bg_image = pygame.transform.scale(
-            self.bg_image, (screen.get_width(), screen.get_height()))
         screen.blit(self.bg_image, offset)
 
 
 class WalkableTile:
-    def __init__(self, blocked_way_rects: List[pygame.rect.RectType] = [], walkable_way_rects: List[pygame.rect.RectType] = []) -> None:
+    """
+    The areas of a scene the player can't walk on.
+
+    A foot rect is walkable when it touches no blocked way, or when it
+    touches a walkable way, which overrides the blocked ways under it.
+
+    The blocked ways are compiled into a bitmap of the scene on the first
+    query (see `chulalife.walkability`), checking a rect is then a mask
+    overlap whatever the number of blocked ways. The blocked ways can also
+    come from a mask image painted over the scene, where opaque pixels are
+    blocked, or walkable with `invert_mask_image`.
+
+    Args:
+        blocked_way_rects (List[RectType], optional): Blocked areas. Defaults to [].
+        walkable_way_rects (List[RectType], optional): Walkable areas over the blocked ones. Defaults to [].
+        mask_image_file_name (str | None, optional): Image of the blocked areas. Defaults to None.
+        invert_mask_image (bool, optional): The mask image paints the walkable area instead. Defaults to False.
+        compile_mask (bool, optional): Check the blocked ways on a bitmap instead of their spatial index.
+            Defaults to the `compile_walkable_masks` setting.
+    """
+
+    def __init__(self, blocked_way_rects: List[pygame.rect.RectType] = [], walkable_way_rects: List[pygame.rect.RectType] = [],
+                 mask_image_file_name: str | None = None, invert_mask_image: bool = False,
+                 compile_mask: bool = compile_walkable_masks) -> None:
         self.debug = walkable_debug
         self.blocked_way_rects: list[pygame.rect.Rect] = blocked_way_rects
         self.walkable_way_rects: list[pygame.rect.Rect] = walkable_way_rects
+        self.mask_image_file_name = mask_image_file_name
+        self.invert_mask_image = invert_mask_image
+        self.compile_mask = compile_mask
+        # Built on the first query, cleared when rects are added
+        self._blocked_mask: pygame.mask.Mask | None = None
+        self._mask_origin = (0, 0)
+        self._blocked_index: SpatialHash | None = None
+        self._walkable_index: SpatialHash | None = None
+
+    @property
+    def blocked_mask(self) -> pygame.mask.Mask:
+        """Bitmap of the scene with the blocked cells set"""
+        if self._blocked_mask is None:
+            size = (WIDTH, HEIGHT)
+            # Blocked ways may reach past the edges of the scene, and so can the player
+            area = bounds(self.blocked_way_rects, size)
+            mask = rasterize(self.blocked_way_rects, area)
+            if self.mask_image_file_name is not None:
+                mask.draw(mask_from_image(self.mask_image_file_name, size, invert=self.invert_mask_image),
+                          (-area.left // walkable_mask_cell_size, -area.top // walkable_mask_cell_size))
+            self._mask_origin = (-area.left, -area.top)
+            self._blocked_mask = mask
+        return self._blocked_mask
 
     def draw(self):
         if self.debug:
             for rect in self.blocked_way_rects:
-                pygame.draw.rect(screen, PURPLE, rect, 5)
+                pygame.draw.rect(get_screen(), PURPLE, rect, 5)
             for rect in self.walkable_way_rects:
-                pygame.draw.rect(screen, GREEN, rect, 5)
+                pygame.draw.rect(get_screen(), GREEN, rect, 5)
 
     def is_walkable(self, player_rect: pygame.Rect) -> bool:
         if not walkable_tile_interactions:
             return True
-        is_collided = False
-        for rect in self.blocked_way_rects:
-            if player_rect.colliderect(rect):
-                is_collided = True
-                break
-        for rect in self.walkable_way_rects:
-            if player_rect.colliderect(rect):
-                is_collided = False
-                break
-        return not is_collided
+        if self._walkable_index is None:
+            self._walkable_index = SpatialHash.of(
+                (rect, rect) for rect in self.walkable_way_rects)
+        if self.compile_mask or self.mask_image_file_name is not None:
+            mask = self.blocked_mask
+            blocked = overlaps(mask, player_rect.move(self._mask_origin))
+        else:
+            if self._blocked_index is None:
+                self._blocked_index = SpatialHash.of(
+                    (rect, rect) for rect in self.blocked_way_rects)
+            blocked = self._blocked_index.collides(player_rect)
+        # A walkable way overrides the blocked ways it overlaps
+        return not blocked or (len(self._walkable_index) > 0 and self._walkable_index.collides(player_rect))
 
     def add_blocked_way(self, *rect: pygame.rect.Rect):
         self.blocked_way_rects.extend(rect)
+        self._blocked_mask = None
+        self._blocked_index = None
         return self
     
     def add_walkable_way(self, *rect: pygame.rect.Rect):
         self.walkable_way_rects.extend(rect)
+        self._walkable_index = None
         return self
@@ -0,0 +1,153 @@
+"""Bake scene backgrounds into display-size images and sprites into an atlas.
+
+Every `StaticBackground` of every level is composited, scaled to each target
+resolution, flattened onto the white clear color and saved as an uncompressed
+image. `StaticBackground` loads the baked variant when it is up to date, which
+skips the PNG decoding, scaling and compositing when a level is constructed.
+
+Every small image the levels load (characters, the player, hearts and buttons)
+is packed at the size it's drawn at into one atlas, see `chulalife.atlas`.
+
+Usage:
+    python -m chulalife.bake [--resolution 1920x1080 ...] [--output assets/baked] [--force]
+"""
+import os
+import argparse
+from typing import TYPE_CHECKING, Iterable, Sequence
+
+from .setting import baked_assets_dir, bake_resolutions
+
+if TYPE_CHECKING:
+    from .levels import Level
+
+
+def baked_path(sources: Sequence[str], size: tuple[int, int], output_dir: str = baked_assets_dir) -> str:
+    name = "+".join(os.path.splitext(os.path.basename(source))[0]
+                    for source in sources)
+    return os.path.join(output_dir, f"{size[0]}x{size[1]}", f"{name}.bmp")
+
+
+def is_up_to_date(path: str, sources: Sequence[str]) -> bool:
+    if not os.path.exists(path):
+        return False
+    mtime = os.path.getmtime(path)
+    return all(os.path.getmtime(source) <= mtime for source in sources)
+
+
+def find_baked(sources: Sequence[str], size: tuple[int, int]) -> str | None:
+    """Path of the baked image for the sources at size, None if it's missing or stale"""
+    path = baked_path(sources, size)
+    return path if is_up_to_date(path, sources) else None
+
+
+def build_levels() -> list["Level"]:
+    """Construct every level with the objects of all its scenes loaded"""
+    from .levels import Level
+
+    levels = []
+    for level_class in Level.__subclasses__():
+        level = level_class(None)
+        for scene_objects in level.objects:
+            for obj in scene_objects:
+                obj.load()
+        levels.append(level)
+    return levels
+
+
+def scene_sources(levels: Iterable["Level"]) -> list[tuple[str, ...]]:
+    """Collect the image files of every StaticBackground used by the levels"""
+    from .background import StaticBackground
+
+    sources: list[tuple[str, ...]] = []
+    for level in levels:
+        for bg in level.bg:
+            if isinstance(bg, StaticBackground) and tuple(bg.sources) not in sources:
+                sources.append(tuple(bg.sources))
+    return sources
+
+
+def bake_atlas(sprites: list[tuple[str, tuple[int, int]]], output_dir: str = baked_assets_dir, force: bool = False) -> list[str]:
+    from .atlas import Atlas, build_atlas
+
+    index_file_name = os.path.join(output_dir, "atlas.json")
+    sources = [source for source, _ in sprites]
+    if not force and is_up_to_date(index_file_name, sources) \
+            and set(Atlas.load(index_file_name).rects) == set(sprites):
+        return []
+    image_file_name = os.path.join(output_dir, "atlas.png")
+    build_atlas(sprites, image_file_name, index_file_name)
+    print(f"Baked {image_file_name} with {len(sprites)} sprites")
+    return [image_file_name, index_file_name]
+
+
+def bake(resolutions: Iterable[tuple[int, int]], output_dir: str = baked_assets_dir, force: bool = False) -> list[str]:
+    """Bake the sprite atlas and every scene background at each resolution
+
+    Args:
+        resolutions (Iterable[tuple[int, int]]): Target display sizes
+        output_dir (str, optional): Directory to write the images to. Defaults to baked_assets_dir.
+        force (bool, optional): Rebake images that are already up to date. Defaults to False.
+
+    Returns:
+        list[str]: Paths of the images written
+    """
+    import pygame
+    from .assets import assets
+    from .atlas import is_atlas_sprite
+    from .color import WHITE
+
+    # Record the images the levels load to find the sprites for the atlas
+    assets.record = set()
+    levels = build_levels()
+    sprites = sorted((path, size) for path, size, convert in assets.record
+                     if is_atlas_sprite((path, size, convert)))
+    assets.record = None
+
+    written = bake_atlas(sprites, output_dir, force)
+    for sources in scene_sources(levels):
+        for size in resolutions:
+            path = baked_path(sources, size, output_dir)
+            if not force and is_up_to_date(path, sources):
+                continue
+            surface = pygame.Surface(size)
+            surface.fill(WHITE)
+            for source in sources:
+                surface.blit(assets.load(source, size), (0, 0))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            pygame.image.save(surface, path)
+            written.append(path)
+            print(f"Baked {path}")
+    return written
+
+
+def parse_resolution(value: str) -> tuple[int, int]:
+    try:
+        width, height = value.lower().split("x")
+        return int(width), int(height)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"Invalid resolution {value!r}, expected WIDTHxHEIGHT")
+
+
+def main(argv: Sequence[str] | None = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m chulalife.bake", description="Bake scene backgrounds and the sprite atlas")
+    parser.add_argument("--resolution", "-r", action="append", type=parse_resolution,
+                        help="Target resolution as WIDTHxHEIGHT, can be repeated")
+    parser.add_argument("--output", "-o", default=baked_assets_dir,
+                        help="Output directory")
+    parser.add_argument("--force", "-f", action="store_true",
+                        help="Rebake images that are already up to date")
+    args = parser.parse_args(argv)
+
+    # Baking doesn't need a visible window
+    import pygame
+    from .screen import init_display
+    init_display(headless=True)
+    pygame.init()
+    written = bake(args.resolution or bake_resolutions, args.output, args.force)
+    print(f"Baked {len(written)} images into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
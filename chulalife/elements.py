@@ -1,16 +1,19 @@
+import threading
 import pygame
-import time
 from typing import Literal
 from pygame.sprite import Sprite
 from pygame.rect import Rect
 from pygame.typing import FileLike
 from pygame.transform import scale_by
-from pygame.image import load
 
 # Internal imports
-from .helper import scale_fit
+from .assets import assets
 from .color import BLACK
+from .inputs import inputs
 from .screen import WIDTH
+from .scheduler import scheduler, Timer
+from .text import text_cache, glyph_atlas, GlyphLine
+from .setting import cursor_blink_interval
 from .logger import get_logger
 
 logger = get_logger(__name__)
@@ -40,6 +43,56 @@ def get_font_pathname(font_type: Literal["display", "content"]) -> str:
     return font_paths[font_type]
 
 
+class FontRegistry:
+    """
+    Shared fonts, each (font type, size) pair is loaded from its file once.
+
+    Opening a font reads the TTF and sets up FreeType, every text on the
+    screen of the same type and size renders with the same `Font`. Fonts
+    are requested while levels are built on prefetch threads, the registry
+    is locked. Rendering with a shared font is safe, pygame holds the GIL
+    while it renders.
+
+    Methods:
+        get(font_type, size): The shared font, loaded on the first request
+        stats(): Number of live fonts, requests and loads
+        clear(): Drop the fonts, the ones in use stay alive until released
+    """
+
+    def __init__(self) -> None:
+        self._fonts: dict[tuple[str, int], pygame.font.Font] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.loads = 0
+
+    def get(self, font_type: Literal["display", "content"], size: int) -> pygame.font.Font:
+        key = (font_type, int(size))
+        with self._lock:
+            self.requests += 1
+            font = self._fonts.get(key)
+            if font is None:
+                font = self._fonts[key] = pygame.font.Font(
+                    get_font_pathname(font_type), key[1])
+                self.loads += 1
+                logger.debug(f"Loaded font {font_type} at size {key[1]}")
+        return font
+
+    def stats(self) -> dict[str, int]:
+        return {"fonts": len(self._fonts), "requests": self.requests, "loads": self.loads}
+
+    def clear(self):
+        with self._lock:
+            self._fonts.clear()
+
+
+fonts = FontRegistry()
+
+
+def get_font(font_type: Literal["display", "content"], size: int) -> pygame.font.Font:
+    """The shared font of a type and size, see `FontRegistry`"""
+    return fonts.get(font_type, size)
+
+
 def create_surface_with_text(text, font_size, text_rgb, bg_rgb=None, font_type: Literal["display", "content"] = "content"):
     """Create a new pygame Surface with rendered text.
 
@@ -60,7 +113,7 @@ def create_surface_with_text(text, font_size, text_rgb, bg_rgb=None, font_type:
         >>> text_surface = create_surface_with_text("Hello", 32, (255, 255, 255))
     """
     """ Returns surface with text written on """
-    font = pygame.font.Font(font_paths[font_type], size=int(font_size))
+    font = get_font(font_type, font_size)
     surface = font.render(text=text, antialias=True,
                           color=text_rgb, background=bg_rgb)
     return surface.convert_alpha()
@@ -89,12 +142,14 @@ class BaseButton(Sprite):
     """
 
     def __init__(self, x, y, w, h, action):
+        super().__init__()
         self.rect = Rect(x, y, w, h)
         self.action = action
         self.clicked = False
+        self.visible = True
 
     def update(self, events):
-        mouse_pos = pygame.mouse.get_pos()
+        mouse_pos = inputs.mouse_pos()
         if self.rect.collidepoint(mouse_pos):
             for event in events:
                 if event.type == pygame.MOUSEBUTTONDOWN:
@@ -110,6 +165,12 @@ class BaseButton(Sprite):
         return self.rect.collidepoint(mouse_pos)
 
 
+# States of an ImageButton, index of its state surfaces and rects
+BUTTON_DEFAULT = 0
+BUTTON_HOVER = 1
+BUTTON_ACTIVE = 2
+
+
 class ImageButton(BaseButton):
     """
     A button class that displays different images based on mouse interaction.
@@ -119,6 +180,10 @@ class ImageButton(BaseButton):
     - Hover state: Shows hover image with optional scaling when mouse hovers over
     - Active state: Shows active image with optional scaling when mouse clicks
 
+    The image and rect of every state are built once at their final scale,
+    a state change only switches `state`. `dirty` is set when the state
+    changes, a level drawing its buttons with the backdrop redraws it then.
+
     Args:
         x (int): X-coordinate position of the button
         y (int): Y-coordinate position of the button
@@ -132,109 +197,162 @@ class ImageButton(BaseButton):
         action (callable): Function to call when button is clicked
 
     Methods:
+        update_state(): Updates the hover and active state from the mouse, returns whether it changed
         draw(screen): Draws the appropriate button state image based on mouse interaction
     """
 
     def __init__(self, x: int, y: int, w: float, h: float, image_filename: str, hover_file_name: str, active_file_name: str, hover_scale_factor: float, active_scale_factor: float, action):
-        self._default_image = load(image_filename).convert_alpha()
-
         super().__init__(x, y, w, h, action)
 
-        w = w or self._default_image.get_width()
-        h = h or self._default_image.get_height()
+        if not w or not h:
+            image_size = assets.image_size(image_filename)
+            w = w or image_size[0]
+            h = h or image_size[1]
         default_rect = Rect(x, y, w, h)
         default_rect.center = (x, y)
 
-        self._default_image, self._rect = scale_fit(
-            self._default_image, default_rect)
+        self._default_image, self.rect = assets.load_fit(
+            image_filename, default_rect)
         self._hover_image = self.scalable_surface(
             hover_file_name, hover_scale_factor, default_rect)
         self._active_image = self.scalable_surface(
             active_file_name, active_scale_factor, default_rect)
         self.hover_scale_factor = hover_scale_factor
         self.active_scale_factor = active_scale_factor
+        self._images = [self._default_image, self._hover_image, self._active_image]
 
         self.mouse_over = False
         self.mouse_down = False
-
-        self._image = self._default_image
+        self.state = BUTTON_DEFAULT
+        self.dirty = True
 
     @property
-    def image(self):
-        if self.mouse_over and self.mouse_down and self._active_image:
-            return self._active_image
-        if self.mouse_over and self._hover_image:
-            return self._hover_image
-        return self._default_image
-
-    @image.setter
-    def image(self, image):
-        self._image = image
+    def image(self) -> pygame.Surface:
+        return self._images[self.state]
 
     @property
-    def rect(self):
-        if self.mouse_over and self._hover_image:
-            return self._hover_image.get_rect(center=self._rect.center)
-        if self.mouse_over and self.mouse_down and self._active_image:
-            return self._active_image.get_rect(center=self._rect.center)
-        return self._default_image.get_rect(center=self._rect.center)
+    def rect(self) -> Rect:
+        if not self._rects:
+            # Every state image centered on the button
+            self._rects = [image.get_rect(center=self._rect.center)
+                           for image in self._images]
+        return self._rects[self.state]
 
     @rect.setter
     def rect(self, rect):
-        self._rect = rect
-
-    def draw(self, screen: pygame.Surface):
-        if self.rect.collidepoint(pygame.mouse.get_pos()):
-            self.mouse_over = True
-            if pygame.mouse.get_pressed()[0]:
-                self.mouse_down = True
-            else:
-                self.mouse_down = False
+        self._rect = Rect(rect)
+        self._rects: list[Rect] = []
+        self.dirty = True
+
+    def update_state(self) -> bool:
+        self.mouse_over = self.rect.collidepoint(inputs.mouse_pos())
+        self.mouse_down = self.mouse_over and inputs.mouse_pressed()[0]
+        if self.mouse_down:
+            state = BUTTON_ACTIVE
+        elif self.mouse_over:
+            state = BUTTON_HOVER
         else:
-            self.mouse_over = False
-            self.mouse_down = False
-
-        if self.mouse_down and self._active_image:
-            self.image = scale_by(self._active_image, self.active_scale_factor)
-        elif self.mouse_over and self._hover_image:
-            self.image = scale_by(self._hover_image, self.hover_scale_factor)
-        else:
-            self.image = self._default_image
-        screen.blit(self.image, self.rect)
+            state = BUTTON_DEFAULT
+        if state == self.state:
+            return False
+        self.state = state
+        self.dirty = True
+        return True
+
+    def draw(self, screen: pygame.Surface) -> Rect:
+        self.update_state()
+        self.dirty = False
+        return screen.blit(self.image, self.rect)
 
     def scalable_surface(self, filename: FileLike | None, scale_factor: float, rect: Rect):
-        return scale_fit(
-            load(
-                filename).convert_alpha(),
+        surface = assets.load_fit(
+            filename,
             Rect(rect.x, rect.y, int(rect.h*scale_factor),
                  int(rect.w*scale_factor))
         )[0] if filename else scale_by(self._default_image, scale_factor)
+        # The state images were always drawn scaled by their factor once more, the buttons keep that size
+        return scale_by(surface, scale_factor)
+
+
+class TextObject(Sprite):
+    """
+    A line of text centered horizontally on the screen.
 
+    Text without a cursor is rendered through the shared `text_cache`. Text
+    with a cursor is typed into, it's drawn glyph by glyph on a `GlyphLine`
+    so typing a letter only blits that letter. Setting the same text again
+    does nothing.
+
+    Args:
+        text (str): Text shown
+        pos (tuple[int, int], optional): The y is the center of the text, the text is centered on the screen. Defaults to (0, 0).
+        color (optional): Text colour. Defaults to BLACK.
+        font (Literal["content", "display"], optional): Font type. Defaults to "content".
+        font_size (int, optional): Font size. Defaults to 36.
+        cursor (bool, optional): Show a blinking cursor after the text, see `start_cursor`. Defaults to False.
+    """
+
+    cursor_width = 5
 
-class TextObject:
     def __init__(self, text: str,  pos: tuple[int, int] = (0, 0), color=BLACK, font: Literal["content", "display"] = "content", font_size: int = 36, cursor: bool = False):
-        self.font = pygame.font.Font(get_font_pathname(font), font_size)
+        super().__init__()
+        self.font = get_font(font, font_size)
+        self.font_key = (font, font_size)
         self.color = color
         self.x = pos[0]
         self.y = pos[1]
         self.cursor = cursor
+        self.visible = True
+        self.line = GlyphLine(glyph_atlas(self.font, self.font_key, color),
+                              self.cursor_width) if cursor else None
+        self.text: str | None = None
         self.update_text(text)
         self.cursor_visible = True
-        self.cursor_last_switch = time.time()
+        self._cursor_timer: Timer | None = None
+        if self.line is not None:
+            self.line.show_cursor(True)
 
-    def draw(self, screen: pygame.surface.Surface):
-        screen.blit(self.rendered_text, self.rect)
-        if self.cursor and self.cursor_visible:
-            cursor_rect = pygame.Rect(
-                self.rect.topright, (5, self.rect.height))
-            pygame.draw.rect(screen, self.color, cursor_rect)
+    @property
+    def image(self) -> pygame.Surface:
+        """The rendered text, with the cursor on its right while it's shown"""
+        if self.line is not None:
+            return self.line.surface
+        return self.rendered_text
+
+    def draw(self, screen: pygame.surface.Surface) -> list[Rect]:
+        return [screen.blit(self.image, self.rect)]
 
     def update_text(self, new_text):
+        if new_text == self.text:
+            return
         self.text = new_text
-        self.rendered_text = self.font.render(self.text, True, self.color)
-        self.rect = self.rendered_text.get_rect(center=(WIDTH // 2, self.y))
-
-    def update_cursor(self):
-        if self.cursor and time.time() - self.cursor_last_switch > 0.5:
-            self.cursor_visible = not self.cursor_visible
-            self.cursor_last_switch = time.time()
+        if self.line is not None:
+            self.line.set_text(new_text)
+            size = self.line.size
+        else:
+            self.rendered_text = text_cache.render(
+                self.font, self.font_key, new_text, self.color)
+            size = self.rendered_text.get_size()
+        self.rect = Rect((0, 0), size)
+        self.rect.center = (WIDTH // 2, self.y)
+
+    def start_cursor(self):
+        """Blink the cursor until `stop_cursor`"""
+        self.stop_cursor()
+        self.set_cursor_visible(True)
+        if self.cursor:
+            self._cursor_timer = scheduler.every(
+                cursor_blink_interval, self.toggle_cursor, owner=self)
+
+    def stop_cursor(self):
+        if self._cursor_timer is not None:
+            self._cursor_timer.cancel()
+            self._cursor_timer = None
+
+    def toggle_cursor(self):
+        self.set_cursor_visible(not self.cursor_visible)
+
+    def set_cursor_visible(self, visible: bool):
+        self.cursor_visible = visible
+        if self.line is not None:
+            self.line.show_cursor(visible)
@@ -0,0 +1,134 @@
+from array import array
+from typing import Generic, Iterator, TypeVar
+from pygame.rect import Rect
+
+# Internal imports
+from .spatial import SpatialHash
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class EntityStore(Generic[T]):
+    """
+    Positions and sizes of a group of entities, packed in integer arrays.
+
+    Each entity has an id, the index of its x, y, width and height in the
+    arrays. The rect of an entity is built the first time it's asked for
+    and kept until the entity moves or is resized, so drawing and collision
+    checks don't allocate a rect per entity and frame. The spatial index
+    answering `query` is kept the same way, until anything moves.
+
+    Methods:
+        add(entity, pos, size): Add an entity and return its id
+        move(id, pos): Move an entity
+        resize(id, size): Resize an entity
+        rect(id): The cached rect of an entity
+        query(rect): Entities colliding with rect, in the order they were added
+    """
+
+    def __init__(self) -> None:
+        self.x = array("i")
+        self.y = array("i")
+        self.w = array("i")
+        self.h = array("i")
+        self.entities: list[T] = []
+        self._rects: list[Rect | None] = []
+        self._index: SpatialHash[T] | None = None
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self.entities)
+
+    def add(self, entity: T, pos: tuple[int, int], size: tuple[int, int]) -> int:
+        self.x.append(int(pos[0]))
+        self.y.append(int(pos[1]))
+        self.w.append(int(size[0]))
+        self.h.append(int(size[1]))
+        self.entities.append(entity)
+        self._rects.append(None)
+        self._index = None
+        return len(self.entities) - 1
+
+    def move(self, id: int, pos: tuple[int, int]):
+        x, y = int(pos[0]), int(pos[1])
+        if self.x[id] != x or self.y[id] != y:
+            self.x[id] = x
+            self.y[id] = y
+            self._invalidate(id)
+
+    def resize(self, id: int, size: tuple[int, int]):
+        w, h = int(size[0]), int(size[1])
+        if self.w[id] != w or self.h[id] != h:
+            self.w[id] = w
+            self.h[id] = h
+            self._invalidate(id)
+
+    def _invalidate(self, id: int):
+        self._rects[id] = None
+        self._index = None
+
+    def rect(self, id: int) -> Rect:
+        """The rect of an entity, shared until it moves, don't modify it"""
+        rect = self._rects[id]
+        if rect is None:
+            rect = self._rects[id] = Rect(self.x[id], self.y[id], self.w[id], self.h[id])
+        return rect
+
+    def query(self, rect: Rect) -> list[T]:
+        index = self._index
+        if index is None:
+            index = self._index = SpatialHash.of(
+                (self.rect(id), entity) for id, entity in enumerate(self.entities))
+        return index.query(rect)
+
+
+class Body:
+    """
+    Position and size component of an entity, stored in an EntityStore.
+
+    A body starts in a store of its own and can be moved to a shared store
+    with `join`, the level puts the objects of a scene in one store.
+
+    Args:
+        owner (object): Entity the body belongs to, returned by store queries
+        pos (tuple[int, int]): Top left corner
+        size (tuple[int, int]): Width and height
+    """
+    __slots__ = ("owner", "store", "id")
+
+    def __init__(self, owner: object, pos: tuple[int, int], size: tuple[int, int]) -> None:
+        self.owner = owner
+        self.store: EntityStore = EntityStore()
+        self.id = self.store.add(owner, pos, size)
+
+    def join(self, store: EntityStore):
+        """Move the body to store, keeping its position and size"""
+        if store is not self.store:
+            pos, size = self.pos, self.size
+            self.store = store
+            self.id = store.add(self.owner, pos, size)
+
+    @property
+    def pos(self) -> tuple[int, int]:
+        return (self.store.x[self.id], self.store.y[self.id])
+
+    @pos.setter
+    def pos(self, pos: tuple[int, int]):
+        self.store.move(self.id, pos)
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return (self.store.w[self.id], self.store.h[self.id])
+
+    @size.setter
+    def size(self, size: tuple[int, int]):
+        self.store.resize(self.id, size)
+
+    @property
+    def rect(self) -> Rect:
+        return self.store.rect(self.id)
@@ -0,0 +1,79 @@
+from typing import Any, Callable
+import pygame
+
+# Internal imports
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+Handler = Callable[[pygame.event.Event], Any]
+
+# Events sent to the component with the keyboard focus instead of the subscribers
+KEYBOARD_EVENTS = frozenset({
+    pygame.KEYDOWN, pygame.KEYUP, pygame.TEXTINPUT, pygame.TEXTEDITING,
+})
+
+
+class EventBus:
+    """
+    Routes each event to the handlers subscribed to its type.
+
+    Components subscribe once to the event types they use instead of
+    scanning the event list of every frame, a component with no events to
+    handle costs nothing. While a component holds the keyboard focus,
+    keyboard events only go to it.
+
+    Handlers are called in subscription order until one returns something
+    other than None, which `dispatch` returns.
+
+    Methods:
+        subscribe(event_type, handler): Call handler with the events of a type
+        unsubscribe(event_type, handler): Stop calling handler
+        take_focus(handler): Send the keyboard events to handler only
+        release_focus(handler): Give the keyboard events back to the subscribers
+        dispatch(event): Call the handlers of an event
+    """
+
+    def __init__(self) -> None:
+        self.handlers: dict[int, list[Handler]] = {}
+        self.focus: Handler | None = None
+
+    def subscribe(self, event_type: int, handler: Handler):
+        handlers = self.handlers.setdefault(event_type, [])
+        if handler not in handlers:
+            handlers.append(handler)
+        return self
+
+    def unsubscribe(self, event_type: int, handler: Handler):
+        handlers = self.handlers.get(event_type)
+        if handlers is not None and handler in handlers:
+            handlers.remove(handler)
+        return self
+
+    def take_focus(self, handler: Handler):
+        if self.focus is not None and self.focus != handler:
+            logger.debug(f"Keyboard focus moved from {self.focus} to {handler}")
+        self.focus = handler
+        return self
+
+    def release_focus(self, handler: Handler):
+        # Only the holder releases, a component closing late doesn't steal it back
+        if self.focus == handler:
+            self.focus = None
+        return self
+
+    def has_focus(self, handler: Handler) -> bool:
+        return self.focus == handler
+
+    def dispatch(self, event: pygame.event.Event) -> Any:
+        if self.focus is not None and event.type in KEYBOARD_EVENTS:
+            return self.focus(event)
+        handlers = self.handlers.get(event.type)
+        if not handlers:
+            return None
+        # Handlers may unsubscribe while handling
+        for handler in tuple(handlers):
+            result = handler(event)
+            if result is not None:
+                return result
+        return None
@@ -1,59 +1,209 @@
-import sys
+import time
+from typing import TYPE_CHECKING
 import pygame
 
-from .overlay import ScreenOverlay, Heart
-from .levels import Level, GameOver, WelcomeScreen
 from .game_state import game_state
-from .setting import music_volume, background_music, FPS
+from .assets import assets
+from .atlas import load_baked_atlas
+from .prefetch import LevelPrefetcher
+from .render import DirtyRectRenderer
+from .screen import init_display
+from .profiler import profiler
+from .inputs import inputs
+from .scheduler import scheduler
+from .audio import audio
+from .startup import StartupLoader, time_since_start
+from .memory import memory
+from .elements import fonts
+from .text import clear_glyph_atlases
+from .setting import FPS, update_rate, max_frame_time, prefetch_next_level, dirty_rect_rendering, use_baked_atlas, headless
+from .logger import get_logger
 
-pygame.init()
-pygame.mixer.init()
+if TYPE_CHECKING:
+    from .levels import Level
+
+logger = get_logger(__name__)
 
 
 class Game:
-    def __init__(self):
+    """
+    The game window and loop.
+
+    Levels change between frames: `set_level` queues a transition and the
+    loop applies it once the frame is presented, calling `Level.exit` on the
+    old level and `Level.enter` on the new one. Transitions triggered by the
+    game state, like losing the last heart, fire once when the state changes.
+
+    The levels and the modules they use are imported once the display is
+    open, while the images of the welcome screen are decoded behind a
+    splash, see `StartupLoader`.
+
+    Args:
+        headless (bool, optional): Run without a window on an off-screen surface,
+            see `init_display`. Defaults to the `headless` setting.
+    """
+
+    def __init__(self, headless: bool = headless):
+        self.headless = headless
+        self.screen = init_display(headless)
+        pygame.init()
+        atlas = load_baked_atlas() if use_baked_atlas else None
+        if atlas is not None:
+            assets.add_atlas(atlas)
+        loader = StartupLoader()
+        loader.start()
+        audio.init()
+        # Imported while the startup images are decoded
+        from .levels import WelcomeScreen, GameOver
+        from .overlay import ScreenOverlay, Heart
+        # Full collections like the leak checks then only go through the objects created from here on
+        memory.freeze()
+
         self.clock = pygame.time.Clock()
+        # Frame rate cap, 0 runs as fast as possible
+        self.fps = FPS
         self.running = True
-        # Start with the Welcome Screen
-        self.level: Level = WelcomeScreen(self)
+        # Whether the first frame was presented, see `time_since_start`
+        self.first_frame = False
+        self.prefetcher = LevelPrefetcher(self)
+        self.renderer = DirtyRectRenderer() if dirty_rect_rendering else None
+        self.transitions: list["Level | type[Level]"] = []
+        # Whether the hearts had run out on the previous frame
+        self.lost = False
+        # Level switched to when the last heart is lost
+        self.game_over_level: "type[Level]" = GameOver
+        self.level: "Level | None" = None
+        # Start with the Welcome Screen, built from the decoded images
+        loader.wait(self.screen)
+        with loader.recording():
+            welcome = WelcomeScreen(self)
+            welcome.load_scene(welcome.current_scene)
+        self.switch_level(welcome)
         self.overlay: ScreenOverlay = ScreenOverlay()
         self.overlay.add("hearts", Heart())
 
-    def set_level(self, level: Level):
+    def set_level(self, level: "Level | type[Level]"):
+        """Switch to a level after the current frame, see `apply_transitions`"""
+        self.transitions.append(level)
+
+    def apply_transitions(self):
+        """Switch to the last level queued, the levels queued before it are skipped without being built"""
+        if not self.transitions:
+            return
+        level = self.transitions[-1]
+        if len(self.transitions) > 1:
+            logger.debug(f"Skipped level transitions: {self.transitions[:-1]}")
+        self.transitions.clear()
+        self.switch_level(level)
+
+    def switch_level(self, level: "Level | type[Level]"):
+        """Switch to a level now, a level class is taken from the prefetcher if it was prefetched"""
+        if isinstance(level, type):
+            level = self.prefetcher.take(level)
+        # A level prefetched for the level left isn't played next anymore, like LevelTwo after a game over
+        self.prefetcher.keep_only(level.next_level)
+        old_level = self.level
+        if old_level is not None:
+            old_level.exit()
         self.level = level
+        level.enter()
+        audio.play_music(level.music)
+        # Before the prefetch threads start competing for the interpreter
+        memory.level_switched(self, old_level)
+        if prefetch_next_level and level.next_level is not None:
+            self.prefetcher.prefetch(level.next_level)
+        logger.debug(f"Asset cache: {assets.stats()}")
+        logger.debug(f"Fonts: {fonts.stats()}")
 
-    def run(self):
-        # Setting up the game
-        self.setup()
+    def run(self, max_frames: int | None = None):
+        """Run the game loop until the game is quit
 
-        # Game loop
-        while self.running:
-            events = pygame.event.get()
-            self.level.events = events
-            for event in events:
-                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
-                    self.running = False
-                else:
-                    action = self.level.handle_events(event)
-                    if action == "exit":
-                        self.running = False
-            if game_state.hearts == 0:
-                self.set_level(GameOver(self))
+        Args:
+            max_frames (int | None, optional): Stop after this many frames, for headless runs.
+                Defaults to None to run until quit.
+        """
+        frames = 0
+
+        # Game loop, the level is simulated in fixed steps of `step` seconds
+        # and drawn once per frame between the last two steps
+        step = 1 / update_rate
+        accumulator = 0.0
+        previous_time = time.perf_counter()
+        while self.running and (max_frames is None or frames < max_frames):
+            frames += 1
+            profiler.begin_frame()
+            now = time.perf_counter()
+            frame = inputs.poll(min(now - previous_time, max_frame_time))
+            previous_time = now
+            if frame is None:
+                # The replayed input is over
+                break
+            accumulator += frame.dt
+
+            with profiler.phase("events"):
+                self.handle_events(frame.events)
+
+            with profiler.phase("update"):
+                while accumulator >= step:
+                    self.level.update()
+                    scheduler.update(step)
+                    accumulator -= step
+            self.check_game_over()
+            audio.update()
 
             # Draw the current level or screen
-            self.level.draw()
+            with profiler.phase("draw"):
+                self.level.draw(accumulator / step)
+            hud_rect = profiler.draw_hud(self.screen)
+            if hud_rect is not None and self.renderer is not None:
+                self.renderer.mark([hud_rect])
 
-            # Update display
-            pygame.display.flip()
-            self.clock.tick(FPS)
+            # Update display, a no-op on the dummy display when headless
+            with profiler.phase("flip"):
+                if self.renderer is not None:
+                    self.renderer.present()
+                else:
+                    pygame.display.flip()
+            with profiler.phase("tick"):
+                self.clock.tick(self.fps)
+            profiler.end_frame()
+            if not self.first_frame:
+                self.first_frame = True
+                logger.info(f"First frame presented {time_since_start():.3f} s after start")
+
+            # Between two frames
+            self.apply_transitions()
 
+        self.prefetcher.shutdown()
+        audio.shutdown()
+        memory.unfreeze()
         pygame.quit()
-        sys.exit()
+        # Fonts can't be used after pygame.quit, a new game loads them again
+        fonts.clear()
+        clear_glyph_atlases()
 
-    def setup(self):
-        pygame.mixer_music.set_volume(music_volume)
-        pygame.mixer_music.load(background_music)
-        pygame.mixer_music.play(-1)
+    def check_game_over(self):
+        """Go to GameOver once when the last heart is lost"""
+        lost = game_state.hearts <= 0
+        if lost and not self.lost:
+            self.set_level(self.game_over_level)
+        self.lost = lost
+
+    def handle_events(self, events: list[pygame.event.Event]):
+        for event in events:
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                self.running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggle_hud()
+                self.level.invalidate()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                profiler.export()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F5:
+                memory.dump(self)
+            else:
+                action = self.level.events.dispatch(event)
+                if action == "exit":
+                    self.running = False
 
 
 if __name__ == "__main__":
@@ -2,6 +2,22 @@ from pygame.transform import scale
 from pygame.surface import Surface
 from pygame.rect import Rect
 
+
+def fit_size(size: tuple[int, int], rect: Rect) -> tuple[int, int]:
+    """Compute the size of an image scaled to fit the rect while maintaining the aspect ratio
+
+    Args:
+        size (tuple[int, int]): width and height of the image
+        rect (Rect): surface to fit into
+
+    Returns:
+        tuple[int, int]: width and height of the scaled image
+    """
+    scale_factor = min(rect.width / size[0],
+                       rect.height / size[1])
+    return int(size[0] * scale_factor), int(size[1] * scale_factor)
+
+
 def scale_fit(surface: Surface, rect: Rect) -> tuple[Surface, Rect]:
     """Scale the image to fit the rect while maintaining the aspect ratio
 
@@ -12,11 +28,6 @@ def scale_fit(surface: Surface, rect: Rect) -> tuple[Surface, Rect]:
     Returns:
         tuple[Surface, Rect]: scaled image and its rect
     """
-    image_rect = surface.get_rect()
-    scale_factor = min(rect.width / image_rect.width,
-                       rect.height / image_rect.height)
-    new_width = int(image_rect.width * scale_factor)
-    new_height = int(image_rect.height * scale_factor)
-    new_image = scale(surface, (new_width, new_height))
+    new_image = scale(surface, fit_size(surface.get_size(), rect))
     new_rect = new_image.get_rect(center=rect.center)
     return new_image, new_rect
@@ -0,0 +1,209 @@
+import gzip
+import json
+from dataclasses import dataclass, field
+from typing import Callable, Sequence
+import pygame
+from pygame.key import ScancodeWrapper
+
+# Internal imports
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# Length of `pygame.key.get_pressed()`, indexed by scancode
+NUM_SCANCODES = 512
+
+# Events written to recordings, mouse motion is covered by the mouse position
+RECORDED_EVENTS = {
+    pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP,
+    pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEWHEEL,
+}
+
+RECORDING_VERSION = 1
+
+
+def pressed_keys(scancodes: Sequence[int] = ()) -> ScancodeWrapper:
+    """Key state like `pygame.key.get_pressed()` with only the scancodes pressed"""
+    pressed = [False] * NUM_SCANCODES
+    for scancode in scancodes:
+        pressed[scancode] = True
+    return ScancodeWrapper(pressed)
+
+
+_scancodes: dict[int, int] = {}
+
+
+def key_scancode(key: int) -> int:
+    """Scancode of a key code, the index `pygame.key.get_pressed()` reads for it"""
+    if key not in _scancodes:
+        _scancodes[key] = next(
+            scancode for scancode in range(NUM_SCANCODES) if pressed_keys([scancode])[key])
+    return _scancodes[key]
+
+
+@dataclass
+class InputFrame:
+    """
+    Everything the game reads from the keyboard and mouse in one frame.
+
+    Args:
+        dt (float): Seconds since the previous frame
+        events (list[Event]): Events of the frame
+        keys (ScancodeWrapper): Pressed keys, like `pygame.key.get_pressed()`
+        mouse_pos (tuple[int, int]): Mouse position
+        mouse_buttons (tuple[bool, bool, bool]): Pressed mouse buttons
+    """
+    dt: float
+    events: list[pygame.event.Event] = field(default_factory=list)
+    keys: ScancodeWrapper = field(default_factory=pressed_keys)
+    mouse_pos: tuple[int, int] = (0, 0)
+    mouse_buttons: tuple[bool, bool, bool] = (False, False, False)
+
+
+def live_frame(dt: float) -> InputFrame:
+    return InputFrame(dt, pygame.event.get(), pygame.key.get_pressed(),
+                      pygame.mouse.get_pos(), pygame.mouse.get_pressed())
+
+
+def _event_to_json(event: pygame.event.Event) -> list:
+    # Window references and other objects can't be replayed, keep plain values
+    attributes = {
+        name: list(value) if isinstance(value, tuple) else value
+        for name, value in event.dict.items()
+        if isinstance(value, (int, float, str, bool, tuple)) or value is None
+    }
+    return [event.type, attributes]
+
+
+def _event_from_json(data: list) -> pygame.event.Event:
+    event_type, attributes = data
+    return pygame.event.Event(event_type, {
+        name: tuple(value) if isinstance(value, list) else value
+        for name, value in attributes.items()
+    })
+
+
+def save_recording(frames: Sequence[InputFrame], file_name: str):
+    """Write frames to a gzipped JSON file, the keys and mouse are only stored when they change"""
+    encoded = []
+    keys = mouse_pos = mouse_buttons = None
+    for frame in frames:
+        entry: dict = {"t": round(frame.dt, 6)}
+        events = [_event_to_json(event) for event in frame.events
+                  if event.type in RECORDED_EVENTS]
+        if events:
+            entry["e"] = events
+        # ScancodeWrapper refuses iteration, iterate the underlying tuple of scancodes
+        frame_keys = [scancode for scancode, pressed
+                      in enumerate(tuple.__iter__(frame.keys)) if pressed]
+        if frame_keys != keys:
+            entry["k"] = keys = frame_keys
+        if frame.mouse_pos != mouse_pos:
+            mouse_pos = frame.mouse_pos
+            entry["m"] = list(mouse_pos)
+        if frame.mouse_buttons != mouse_buttons:
+            mouse_buttons = frame.mouse_buttons
+            entry["b"] = list(mouse_buttons)
+        encoded.append(entry)
+    with gzip.open(file_name, "wt") as f:
+        json.dump({"version": RECORDING_VERSION, "frames": encoded},
+                  f, separators=(",", ":"))
+
+
+def load_recording(file_name: str) -> list[InputFrame]:
+    with gzip.open(file_name, "rt") as f:
+        data = json.load(f)
+    if data.get("version") != RECORDING_VERSION:
+        raise ValueError(
+            f"Unsupported recording version {data.get('version')} in {file_name}")
+    frames = []
+    keys = pressed_keys()
+    mouse_pos = (0, 0)
+    mouse_buttons = (False, False, False)
+    for entry in data["frames"]:
+        if "k" in entry:
+            keys = pressed_keys(entry["k"])
+        if "m" in entry:
+            mouse_pos = tuple(entry["m"])
+        if "b" in entry:
+            mouse_buttons = tuple(entry["b"])
+        frames.append(InputFrame(
+            entry["t"], [_event_from_json(event) for event in entry.get("e", [])],
+            keys, mouse_pos, mouse_buttons))
+    return frames
+
+
+class Inputs:
+    """
+    The keyboard and mouse input of the current frame.
+
+    The game reads its input from here instead of from pygame, so that the
+    input can be recorded and replayed. Each frame `Game.run` calls `poll`,
+    which takes the next frame from the source: pygame by default, a
+    recording while replaying, or any function returning frames such as a
+    scripted playthrough. A replayed frame also replaces the frame time, so
+    the fixed-timestep simulation runs the same steps as when recording.
+
+    Methods:
+        poll(dt): Read the input of the next frame, None when the replay is over
+        get_pressed(): Pressed keys, like `pygame.key.get_pressed()`
+        mouse_pos(): Mouse position, like `pygame.mouse.get_pos()`
+        mouse_pressed(): Pressed buttons, like `pygame.mouse.get_pressed()`
+        start_recording(): Keep every polled frame
+        save(file_name): Write the recorded frames
+        replay(frames): Play frames or a recording file instead of the live input
+        drive(source): Take the frames from a function of the real frame time
+        live(): Go back to reading pygame
+    """
+
+    def __init__(self) -> None:
+        self.frame = InputFrame(0.0)
+        self.recording: list[InputFrame] | None = None
+        self._source: Callable[[float], InputFrame | None] = live_frame
+
+    def poll(self, dt: float) -> InputFrame | None:
+        frame = self._source(dt)
+        if frame is None:
+            return None
+        self.frame = frame
+        if self.recording is not None:
+            self.recording.append(frame)
+        return frame
+
+    def get_pressed(self) -> ScancodeWrapper:
+        return self.frame.keys
+
+    def mouse_pos(self) -> tuple[int, int]:
+        return self.frame.mouse_pos
+
+    def mouse_pressed(self) -> tuple[bool, bool, bool]:
+        return self.frame.mouse_buttons
+
+    def start_recording(self):
+        self.recording = []
+
+    def save(self, file_name: str):
+        if self.recording is None:
+            raise RuntimeError("Not recording, call start_recording() first")
+        save_recording(self.recording, file_name)
+        logger.info(f"Saved {len(self.recording)} frames to {file_name}")
+
+    def replay(self, frames: str | Sequence[InputFrame]):
+        if isinstance(frames, str):
+            frames = load_recording(frames)
+        remaining = iter(frames)
+
+        def next_frame(dt: float) -> InputFrame | None:
+            # Keep the window responsive, the live events are ignored
+            pygame.event.pump()
+            return next(remaining, None)
+        self._source = next_frame
+
+    def drive(self, source: Callable[[float], InputFrame | None]):
+        self._source = source
+
+    def live(self):
+        self._source = live_frame
+
+
+inputs = Inputs()
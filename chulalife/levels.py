@@ -1,18 +1,26 @@
 import pygame
-from typing import List, TYPE_CHECKING
+from concurrent.futures import Future
+from functools import partial
+from typing import Callable, Iterable, List, TYPE_CHECKING
 from pygame.rect import Rect
 
 from .overlay import ScreenOverlay, Heart
 from .elements import ImageButton
 from .background import StaticBackground, WalkableTile, Background
-from .helper import scale_fit
+from .assets import assets
 from .color import WHITE
 from .player import Player
 from .object import WarpDoor, Object, QuestCharacter, BlockerCharacter
-from .screen import WIDTH, HEIGHT, screen
+from .render import DirtyRectRenderer, LayeredRenderer, LAYER_BACKGROUND, LAYER_OBJECTS, LAYER_PLAYER, LAYER_BUTTONS, LAYER_OVERLAY_BACKDROP, LAYER_OVERLAY
+from .screen import WIDTH, HEIGHT, get_screen
 from .logger import get_logger
-from .setting import charector_interaction, initial_hearts
+from .setting import charector_interaction, initial_hearts, prefetch_adjacent_scenes, background_music
 from .game_state import game_state
+from .profiler import profiler
+from .inputs import inputs
+from .entities import EntityStore
+from .events import EventBus
+from .audio import audio
 
 if TYPE_CHECKING:
     from .game import Game
@@ -20,6 +28,11 @@ if TYPE_CHECKING:
 logger = get_logger(__name__)
 
 
+def decode_all(decoders: list[Callable[[], object]]):
+    for decode in decoders:
+        decode()
+
+
 class Level:
     """
     A class to represent a game level.
@@ -36,6 +49,10 @@ class Level:
         A list of lists containing objects in each scene of the level.
     overlay : ScreenOverlay
         The screen overlay for the level.
+    events : EventBus
+        Routes the events of the frame to the level and its overlay objects.
+    sprites : LayeredRenderer
+        The sprites drawn for the current scene, by layer.
     player : Player | None
         The player character in the level.
     bg : list[Background]
@@ -45,106 +62,320 @@ class Level:
 
     Methods:
     --------
+    enter():
+        Called by the game when it switches to the level.
+    exit():
+        Called by the game when it switches to another level.
     handle_events(event):
-        Handles events such as mouse clicks.
-    draw():
+        Handles mouse clicks on the buttons, subscribed to the level's events.
+    update():
+        Moves the player and checks interactions, once per fixed simulation step.
+    draw(alpha: float):
         Draws the level, including background, objects, player, buttons, and overlay.
     check_interaction():
         Checks for interactions between the player and objects in the current scene.
+    scene_entities(scene: int):
+        The store of the positions and sizes of a scene's objects.
+    objects_colliding(rect: Rect):
+        Finds the objects of the current scene colliding with a rect through the scene's entity store.
     set_scene(scene: int, pos=(0, 0)):
         Sets the current scene and optionally the player's position.
+    enter_scene(scene: int):
+        Loads the scene, prefetches the scenes next to it and unloads the others.
+    scene_decoders(scene: int):
+        Functions decoding the images of a scene into the asset cache, run by the prefetch threads.
+    build_sprites():
+        Puts the current scene, the player and the buttons in the sprite layers.
     """
 
+    # The level played after this one, prefetched while this level is played
+    next_level: type["Level"] | None = None
+    # Track played while the level is shown, None for silence
+    music: str | None = background_music
+
     def __init__(self, game):
         self.game: Game = game
         self.buttons = []
         self.current_scene: int = 0
         self.objects: List[List[Object]] = []
-        self.overlay: ScreenOverlay = ScreenOverlay().add("hearts", Heart())
+        self.sprites = LayeredRenderer()
+        self.events = EventBus().subscribe(pygame.MOUSEBUTTONDOWN, self.handle_events)
+        self.overlay: ScreenOverlay = ScreenOverlay(
+            self.sprites, self.events).add("hearts", Heart())
         self.player: Player | None = Player((0, 0))
         self.bg: list[Background] = []
         self.walkable_mask = []
-        self.events = []
+        self.loaded_scenes: set[int] = set()
+        # Neighbour scenes whose images are being decoded on the prefetch threads
+        self.decoding: dict[int, Future] = {}
+        # Positions and sizes of the objects of each scene, built when the scene is first used
+        self.entities: dict[int, EntityStore[Object]] = {}
 
     def handle_events(self, event):
         if event.type == pygame.MOUSEBUTTONDOWN:
-            mouse_pos = pygame.mouse.get_pos()
+            mouse_pos = inputs.mouse_pos()
             for button in self.buttons:
                 if button.is_clicked(mouse_pos):
                     return button.action()
         
         return None
 
-    def draw(self):
-        screen.fill(WHITE)
-        # Draw background
-        if len(self.bg) > 0:
-            self.bg[self.current_scene].draw(screen)
+    def enter(self):
+        self.enter_scene(self.current_scene)
+        self.invalidate()
+
+    def exit(self):
+        # Removing the overlay objects stops their timers, an open question's cursor would keep the level alive
+        self.overlay.clear()
+        self.cancel_decoding()
+        # The level isn't drawn anymore, its images stay in the asset cache while there's room
+        for scene in list(self.loaded_scenes):
+            self.unload_scene(scene)
+
+    @property
+    def renderer(self) -> DirtyRectRenderer | None:
+        return self.game.renderer if self.game is not None else None
+
+    @property
+    def fullscreen_overlay_open(self) -> bool:
+        return self.overlay.is_fullscreen_open and charector_interaction
+
+    @property
+    def retained_buttons(self) -> bool:
+        """Whether the buttons are drawn with the backdrop, only when no player can move over them"""
+        return self.player is None
+
+    def invalidate(self):
+        """Redraw the backdrop on the next frame"""
+        if self.renderer is not None:
+            self.renderer.invalidate()
+
+    def update(self):
+        """Advance the level by one fixed simulation step"""
+        if self.player is not None:
+            # Movement is disabled when fullscreen overlay is open
+            with profiler.phase("movement"):
+                self.player.update(not self.fullscreen_overlay_open)
+
+        # Check for interaction with objects
+        with profiler.phase("check_interaction"):
+            self.check_interaction()
+
+    def draw(self, alpha: float = 1.0):
+        """Draw the level
+
+        Args:
+            alpha (float, optional): How far the frame is between the last simulation
+                step and the next one, used to interpolate positions. Defaults to 1.0.
+        """
+        with profiler.phase("ui_update"):
+            for button in self.buttons:
+                button.update_state()
+                if button.dirty:
+                    if self.retained_buttons:
+                        # The buttons are part of the backdrop, redraw it with the new state
+                        self.invalidate()
+                    button.dirty = False
+            self.overlay.update()
+        if self.player is not None:
+            self.player.alpha = alpha
+
+        screen = get_screen()
+        renderer = self.renderer
+        if renderer is None or renderer.needs_redraw:
+            self.draw_backdrop()
+            if renderer is not None:
+                renderer.capture(screen)
+        else:
+            renderer.restore(screen)
+
+        dirty_rects = self.draw_dynamic()
+        if renderer is not None:
+            renderer.mark(dirty_rects)
+
+    def draw_backdrop(self):
+        """Draw the parts of the frame that only change with the scene or the overlay"""
+        screen = get_screen()
+        if self.fullscreen_overlay_open:
+            # Everything else is hidden under the overlay
+            with profiler.phase("overlay"):
+                self.sprites.draw_layers(
+                    screen, LAYER_OVERLAY_BACKDROP, LAYER_PLAYER)
+            return
+
+        # Draw background and objects
+        with profiler.phase("background"):
+            screen.fill(WHITE)
+            self.sprites.draw_layers(screen, LAYER_BACKGROUND, LAYER_OBJECTS)
+        with profiler.phase("objects"):
+            self.sprites.draw_layers(screen, LAYER_OBJECTS, LAYER_PLAYER)
+        if self.retained_buttons:
+            with profiler.phase("buttons"):
+                self.sprites.draw_layers(screen, LAYER_BUTTONS, LAYER_OVERLAY)
 
         if len(self.walkable_mask) > 0:
             self.walkable_mask[self.current_scene].draw()
 
-        # Draw objects
-        if len(self.objects) > 0 and len(self.objects[self.current_scene]) > 0:
-            for i, obj in enumerate(self.objects[self.current_scene]):
-                obj.draw()
-
-        if len(self.walkable_mask) > 0 and self.player is not None:
-            self.player.walkable_mask = self.walkable_mask[self.current_scene]
-
+        for obj in self.scene_entities(self.current_scene):
+            obj.draw_debug()
+
+    def draw_dynamic(self) -> list[Rect]:
+        """Draw the moving parts of the frame and return the rects drawn"""
+        screen = get_screen()
+        if self.fullscreen_overlay_open:
+            with profiler.phase("overlay"):
+                return self.sprites.draw_layers(screen, LAYER_OVERLAY)
+
+        # Draw player, buttons and overlay
+        with profiler.phase("player"):
+            dirty_rects = self.sprites.draw_layers(
+                screen, LAYER_PLAYER, LAYER_BUTTONS)
+            if self.player is not None:
+                self.player.draw_debug(screen)
+        if not self.retained_buttons:
+            with profiler.phase("buttons"):
+                dirty_rects += self.sprites.draw_layers(
+                    screen, LAYER_BUTTONS, LAYER_OVERLAY)
+        with profiler.phase("overlay"):
+            dirty_rects += self.sprites.draw_layers(screen, LAYER_OVERLAY)
+        return dirty_rects
+
+    def build_sprites(self):
+        for layer in (LAYER_BACKGROUND, LAYER_OBJECTS, LAYER_PLAYER, LAYER_BUTTONS):
+            self.sprites.remove_sprites_of_layer(layer)
+        if self.current_scene < len(self.bg):
+            self.sprites.add(self.bg[self.current_scene], layer=LAYER_BACKGROUND)
+        self.sprites.add(*self.scene_entities(self.current_scene), layer=LAYER_OBJECTS)
         if self.player is not None:
-            self.player.draw(screen)
-
-        # Draw buttons
-        for button in self.buttons:
-            button.draw(screen)
-
-
-        self.overlay.events = self.events
-        self.overlay.draw()
-
-        # Handle keyboard events for player movement
-        # Disabled when fullscreen overlay is open
-        if (not self.overlay.is_fullscreen_open or not charector_interaction) and self.player is not None:
-            self.player.handle_keys()
-
-            # Check for interaction with objects
-        self.check_interaction()
+            self.sprites.add(self.player, layer=LAYER_PLAYER)
+        self.sprites.add(*self.buttons, layer=LAYER_BUTTONS)
+
+    def scene_entities(self, scene: int) -> EntityStore[Object]:
+        """The objects of a scene, their positions and sizes packed in one store"""
+        store = self.entities.get(scene)
+        if store is None:
+            store = self.entities[scene] = EntityStore()
+            if scene < len(self.objects):
+                for obj in self.objects[scene]:
+                    obj.body.join(store)
+        return store
+
+    def objects_colliding(self, rect: Rect) -> list[Object]:
+        """Objects of the current scene colliding with rect, in the order of the scene"""
+        return self.scene_entities(self.current_scene).query(rect)
 
     def check_interaction(self):
         if len(self.objects) == 0 or self.player is None:
             return
-        for obj in self.objects[self.current_scene]:
-            if self.player.rect.colliderect(obj.rect):
-                if isinstance(obj, WarpDoor):
-                    if obj.action is not None:
-                        obj.action()
-                        return
-                    self.current_scene = obj.warpTarget
-                    self.player.rect.left = obj.next_pos_x
-                    self.player.rect.top = obj.next_pos_y
-                elif isinstance(obj, QuestCharacter):
-                    logger.debug(f"Player interact with {obj.name}")
-                    if self.overlay.has_element("question"):
-                        if obj.question.status == "done":
-                            self.overlay\
-                                .set_element_visible("question", False)\
-                                .remove("question")\
-                                .set_fullscreen_open(False)
-                            obj.clear()
-                    else:
-                        if obj.question.status != "done":
-                            self.overlay\
-                                .add("question", obj.dialog)\
-                                .set_element_visible("question", True)\
-                                .set_fullscreen_open(True)
-                elif isinstance(obj, BlockerCharacter):
-                    pass
+        for obj in self.objects_colliding(self.player.rect):
+            if isinstance(obj, WarpDoor):
+                if obj.action is not None:
+                    obj.action()
+                    return
+                audio.play("warp")
+                self.set_scene(obj.warpTarget,
+                               (obj.next_pos_x, obj.next_pos_y))
+                return
+            elif isinstance(obj, QuestCharacter):
+                logger.debug(f"Player interact with {obj.name}")
+                if self.overlay.has_element("question"):
+                    # Only close the question of this character, the player can touch several
+                    if obj.question.status == "done" and self.overlay.get_element("question") is obj.dialog:
+                        self.overlay\
+                            .set_element_visible("question", False)\
+                            .remove("question")\
+                            .set_fullscreen_open(False)
+                        self.invalidate()
+                        obj.clear()
+                else:
+                    if obj.question.status != "done":
+                        self.overlay\
+                            .add("question", obj.dialog)\
+                            .set_element_visible("question", True)\
+                            .set_fullscreen_open(True)
+                        self.invalidate()
+            elif isinstance(obj, BlockerCharacter):
+                pass
 
     def set_scene(self, scene: int, pos=(0, 0)):
         self.current_scene = scene
+        self.enter_scene(scene)
+        self.invalidate()
         if self.player is not None:
-            self.player._rect.topleft = pos
+            self.player.rect.topleft = pos
+            self.player.snap()
+
+    @property
+    def scene_count(self) -> int:
+        return max(len(self.bg), len(self.objects), len(self.walkable_mask))
+
+    def scene_neighbours(self, scene: int) -> set[int]:
+        """Scenes reachable from the scene through a warp door"""
+        if scene >= len(self.objects):
+            return set()
+        return {
+            obj.warpTarget for obj in self.objects[scene]
+            if isinstance(obj, WarpDoor) and obj.action is None
+            and obj.warpTarget != scene and obj.warpTarget < self.scene_count
+        }
+
+    def load_scene(self, scene: int):
+        # Safe to call again on a loaded scene, only missing images are loaded
+        if scene < len(self.bg):
+            self.bg[scene].load()
+        if scene < len(self.objects):
+            for obj in self.objects[scene]:
+                obj.load()
+        self.loaded_scenes.add(scene)
+
+    def unload_scene(self, scene: int):
+        if scene < len(self.bg):
+            self.bg[scene].unload()
+        if scene < len(self.objects):
+            for obj in self.objects[scene]:
+                obj.unload()
+        self.loaded_scenes.discard(scene)
+
+    def scene_decoders(self, scene: int) -> list[Callable[[], object]]:
+        """Functions decoding the images of a scene into the asset cache
+
+        They only reference the images, not the level or its objects, so a
+        queued decode doesn't keep a level that was left alive.
+        """
+        decoders: list[Callable[[], object]] = []
+        if scene < len(self.bg):
+            decoders.append(self.bg[scene].render)
+        if scene < len(self.objects):
+            decoders += [partial(assets.load, obj.image_filename, obj.scaled_size)
+                         for obj in self.objects[scene] if obj.image_filename]
+        return decoders
+
+    def cancel_decoding(self, keep: Iterable[int] = ()):
+        """Cancel the decoding of the neighbour scenes not in keep, the ones already decoding finish"""
+        for scene in list(self.decoding):
+            if scene not in keep:
+                self.decoding.pop(scene).cancel()
+
+    def enter_scene(self, scene: int):
+        self.load_scene(scene)
+        if len(self.walkable_mask) > 0 and self.player is not None:
+            # Set before the next simulation step moves the player in the scene
+            self.player.walkable_mask = self.walkable_mask[scene]
+        self.build_sprites()
+        neighbours = self.scene_neighbours(scene)
+        # Unload scenes more than one warp away
+        for other in list(self.loaded_scenes):
+            if other != scene and other not in neighbours:
+                self.unload_scene(other)
+        self.cancel_decoding(neighbours)
+        if not prefetch_adjacent_scenes or self.game is None:
+            return
+        # The threads only fill the asset cache, the images are set on the game thread when the scene is entered
+        for neighbour in neighbours - self.loaded_scenes:
+            future = self.decoding.get(neighbour)
+            # Decoded again if the images were evicted since
+            if future is None or future.done():
+                self.decoding[neighbour] = self.game.prefetcher.submit(decode_all, self.scene_decoders(neighbour))
 
 
 class WelcomeScreen(Level):
@@ -161,7 +392,7 @@ class WelcomeScreen(Level):
                 active_file_name="assets/scene/welcome/Button_click.png",
                 hover_scale_factor=1.3,
                 active_scale_factor=1.25,
-                action=lambda: self.game.set_level(LevelOne(self.game))
+                action=lambda: self.game.set_level(LevelOne)
             )
         ]
 
@@ -169,14 +400,8 @@ class WelcomeScreen(Level):
             StaticBackground("assets/scene/welcome/startbg.png")
         ]
 
-    def draw(self):
-        StaticBackground("assets/scene/welcome/startbg.png")
-        bg_image, bg_rect = scale_fit(pygame.image.load(
-            "assets/scene/welcome/startbg.png"), screen.get_rect())
-        screen.blit(bg_image, bg_rect)
-
-        for button in self.buttons:
-            button.draw(screen)
+        self.player = None
+        self.overlay.set_visible(False)
 
 
 class LevelOne(Level):
@@ -202,7 +427,7 @@ class LevelOne(Level):
             [
                 WarpDoor((0, 197), (100, 200), 1, (1723, 407)),
                 WarpDoor((WIDTH // 2 - 250 // 2, HEIGHT - 100),
-                         (250, 100), 3, (0, 0), lambda: self.game.set_level(LevelTwo(self.game))),
+                         (250, 100), 3, (0, 0), lambda: self.game.set_level(LevelTwo)),
                 QuestCharacter("Q3_yellow", (367, 72)),
                 QuestCharacter("Q4_red", (917, 622), (572*0.3, 972*0.3)),
                 BlockerCharacter((1617, 72))
@@ -256,8 +481,7 @@ class LevelTwo(Level):
                          1, (WIDTH // 2 - self.player.rect.w // 2, 20))
             ],
             [
-                QuestCharacter("Q7_panda", (848, 545), after_action=lambda: self.game.set_level(
-                    LevelThree(self.game))),
+                QuestCharacter("Q7_panda", (848, 545), after_action=lambda: self.game.set_level(LevelThree)),
             ]
         ]
 
@@ -280,7 +504,7 @@ class LevelThree(Level):
             ],
             [
                 QuestCharacter("Q9_shiba", (850, 250),
-                               after_action=lambda: self.game.set_level(LevelFour(self.game))),
+                               after_action=lambda: self.game.set_level(LevelFour)),
             ]
         ]
 
@@ -298,8 +522,7 @@ class LevelFour(Level):
 
         self.objects = [
             [
-                QuestCharacter("Q10_deer", (200, 300), after_action=lambda: self.game.set_level(
-                    LevelFive(self.game)))
+                QuestCharacter("Q10_deer", (200, 300), after_action=lambda: self.game.set_level(LevelFive))
             ]
         ]
 
@@ -318,8 +541,7 @@ class LevelFive(Level):
 
         self.objects = [
             [
-                QuestCharacter("Q11_fox", (825, 475), after_action=lambda: self.game.set_level(
-                    EndGame(self.game)))
+                QuestCharacter("Q11_fox", (825, 475), after_action=lambda: self.game.set_level(EndGame))
             ]
         ]
 
@@ -351,7 +573,7 @@ class GameOver(Level):
 
     def reset_game(self):
         game_state.hearts = initial_hearts
-        self.game.set_level(WelcomeScreen(self.game))
+        self.game.set_level(WelcomeScreen)
 
 
 class EndGame(Level):
@@ -381,4 +603,15 @@ class EndGame(Level):
 
     def reset_game(self):
         game_state.hearts = initial_hearts
-        self.game.set_level(WelcomeScreen(self.game))
+        self.game.set_level(WelcomeScreen)
+
+
+# Level progression
+WelcomeScreen.next_level = LevelOne
+LevelOne.next_level = LevelTwo
+LevelTwo.next_level = LevelThree
+LevelThree.next_level = LevelFour
+LevelFour.next_level = LevelFive
+LevelFive.next_level = EndGame
+GameOver.next_level = WelcomeScreen
+EndGame.next_level = WelcomeScreen
@@ -1,13 +1,105 @@
+import atexit
 import logging
-from .setting import logging_level
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from .setting import logging_level, async_logging, log_rate_limit
+
+PACKAGE = __name__.rpartition(".")[0]
+
+FORMAT = '[%(asctime)s] %(levelname)s [%(name)s] %(message)s'
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most `rate` records per second through from each logging call.
+
+    A call site is the file and line of the logging call. The records
+    dropped in a second are counted and reported with the next record let
+    through from the same call, so a message logged every frame shows up
+    about `rate` times a second with how many were skipped.
+
+    Args:
+        rate (int): Records per second and call site, 0 lets everything through
+    """
+
+    def __init__(self, rate: int = log_rate_limit) -> None:
+        super().__init__()
+        self.rate = rate
+        # Call site -> [start of the current second, records let through, records dropped]
+        self.sites: dict[tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0:
+            return True
+        site = (record.pathname, record.lineno)
+        with self._lock:
+            state = self.sites.get(site)
+            if state is None:
+                state = self.sites[site] = [record.created, 0, 0]
+            if record.created - state[0] >= 1.0:
+                state[0] = record.created
+                state[1] = 0
+            if state[1] >= self.rate:
+                state[2] += 1
+                return False
+            state[1] += 1
+            dropped, state[2] = state[2], 0
+        if dropped:
+            record.msg = f"{record.msg} ({dropped} similar messages skipped)"
+        return True
+
+
+_handler: logging.Handler | None = None
+_listener: QueueListener | None = None
+
+
+def _stop_listener():
+    if _listener is not None:
+        # Writes the records still in the queue
+        _listener.stop()
+
+
+def _shared_handler() -> logging.Handler:
+    """The handler every logger writes to, created on the first call"""
+    global _handler, _listener
+    if _handler is not None:
+        return _handler
+    stream = logging.StreamHandler()
+    stream.setFormatter(logging.Formatter(FORMAT))
+    if async_logging:
+        # The game only puts records in a queue, a thread writes them to stderr
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        handler: logging.Handler = QueueHandler(records)
+        _listener = QueueListener(records, stream, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_stop_listener)
+    else:
+        handler = stream
+    handler.addFilter(RateLimitFilter())
+    _handler = handler
+    return handler
 
 
 def get_logger(name):
+    """The logger of a module, writing through the shared rate-limited handler
+
+    Loggers of the package's modules go through the package logger, so the
+    shared handler is added once whatever the number of calls.
+    """
+    handler = _shared_handler()
     logger = logging.getLogger(name)
-    logger.setLevel(logging_level)
-    formatter = logging.Formatter(
-        '[%(asctime)s] %(levelname)s [%(name)s] %(message)s')
-    ch = logging.StreamHandler()
-    ch.setFormatter(formatter)
-    logger.addHandler(ch)
+    if name != PACKAGE and not name.startswith(PACKAGE + "."):
+        # A logger outside the package, like a script's __main__
+        logger.setLevel(logging_level)
+        if handler not in logger.handlers:
+            logger.addHandler(handler)
+        return logger
+    package = logging.getLogger(PACKAGE)
+    if handler not in package.handlers:
+        package.setLevel(logging_level)
+        package.addHandler(handler)
+        # Don't write twice when the application configures the root logger
+        package.propagate = False
     return logger
@@ -0,0 +1,250 @@
+import gc
+import os
+import weakref
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Iterable, Iterator
+from pygame.surface import Surface
+
+# Internal imports
+from .assets import assets, surface_bytes
+from .text import text_cache, glyph_atlases
+from .setting import memory_leak_check, memory_log_switches, memory_dump_top
+from .logger import get_logger
+
+if TYPE_CHECKING:
+    from .game import Game
+    from .levels import Level
+
+logger = get_logger(__name__)
+
+# Attributes followed from a holder to find its surfaces, enough to reach the text lines of a question
+SCAN_DEPTH = 4
+
+Holder = tuple[str, list]
+
+
+def find_surfaces(value: object, depth: int = SCAN_DEPTH, excluded: Iterable[Surface] = ()) -> Iterator[Surface]:
+    """Surfaces referenced by value through the attributes of game objects and containers
+
+    Levels and the game are not followed, their parts are holders of their own.
+    """
+    from .game import Game
+    from .levels import Level
+
+    return _find_surfaces(value, depth, {id(surface) for surface in excluded}, (Level, Game))
+
+
+def _find_surfaces(value: object, depth: int, seen: set[int], holders: tuple[type, ...]) -> Iterator[Surface]:
+    if id(value) in seen:
+        return
+    seen.add(id(value))
+    if isinstance(value, Surface):
+        yield value
+        return
+    if depth == 0:
+        return
+    if isinstance(value, Mapping):
+        values: Iterable = value.values()
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        values = value
+    elif type(value).__module__.startswith(__package__ + ".") and hasattr(value, "__dict__") \
+            and not isinstance(value, holders):
+        values = vars(value).values()
+    else:
+        return
+    for item in values:
+        yield from _find_surfaces(item, depth - 1, seen, holders)
+
+
+def level_holders(level: "Level", prefix: str = "") -> list[Holder]:
+    """The parts of a level holding surfaces, named after the level, the scene and the object type"""
+    name = f"{prefix}{type(level).__name__}"
+    holders: dict[str, list] = {}
+    for scene, bg in enumerate(level.bg):
+        holders.setdefault(f"{name}/scene {scene}/background", []).append(bg)
+    for scene, objects in enumerate(level.objects):
+        for obj in objects:
+            holders.setdefault(f"{name}/scene {scene}/{type(obj).__name__}", []).append(obj)
+    if level.player is not None:
+        holders[f"{name}/player"] = [level.player]
+    if level.buttons:
+        holders[f"{name}/buttons"] = list(level.buttons)
+    for key, element in level.overlay.overlay_objects.items():
+        holders[f"{name}/overlay/{key}"] = [element]
+    return list(holders.items())
+
+
+def resident_bytes() -> int | None:
+    """Resident memory of the process, None where /proc isn't available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def megabytes(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+class MemoryTracker:
+    """
+    Tallies the bytes of the live surfaces by holder and reports the surfaces of levels left behind.
+
+    A holder is a shared cache or a part of a level: the background or the
+    objects of one type in a scene, the player, the buttons or an overlay
+    element. A surface referenced by several holders is owned by the first
+    one, caches first, so the own bytes of a holder are what freeing it
+    would release and its referenced bytes are everything it draws with.
+
+    On every level switch the surfaces owned by the level left are kept as
+    weak references. The level should be freed by the next switch, its
+    surfaces still alive then and not used by anything else are reported
+    as leaked, with what still references the level.
+
+    The leak check and the log on every switch are off by default, they
+    run on the game thread while the level switches.
+
+    Args:
+        leak_check (bool): Check for leaks on every level switch
+        log_switches (bool): Log the memory used on every level switch
+
+    Methods:
+        freeze(): Leave the objects alive now out of the collections, once per process
+        unfreeze(): Collect them again
+        snapshot(game): Own and referenced bytes of each holder
+        level_switched(game, old_level): Check the levels left before and remember old_level
+        dump(game): Log the holders owning the most bytes
+    """
+
+    def __init__(self, leak_check: bool = memory_leak_check, log_switches: bool = memory_log_switches) -> None:
+        self.leak_check = leak_check
+        self.log_switches = log_switches
+        # Names and weak references of the levels left, and of the surfaces they owned
+        self._levels: list[tuple[str, weakref.ref]] = []
+        self._surfaces: list[tuple[str, weakref.ref[Surface], int]] = []
+        self._frozen = False
+
+    def freeze(self):
+        """Leave the objects alive now out of the collections, full collections then only go through the newer ones
+
+        Called once the game's modules are imported, they live as long as the
+        process. A game started after another one doesn't freeze again, the
+        levels of the first game would never be collected.
+        """
+        if self._frozen:
+            return
+        self._frozen = True
+        gc.collect()
+        gc.freeze()
+
+    def unfreeze(self):
+        gc.unfreeze()
+
+    def holders(self, game: "Game") -> list[Holder]:
+        holders: list[Holder] = [
+            ("screen", [game.screen]),
+            ("cache/assets", assets.surfaces()),
+            ("cache/text", text_cache.surfaces()),
+            ("cache/glyphs", [atlas.glyphs for atlas in glyph_atlases()]),
+        ]
+        if game.renderer is not None:
+            holders.append(("renderer/backdrop", [game.renderer.backdrop]))
+        if game.level is not None:
+            holders += level_holders(game.level)
+        for level in game.prefetcher.prefetched():
+            holders += level_holders(level, "prefetched/")
+        # The game's overlay is created after the first level
+        overlay = getattr(game, "overlay", None)
+        if overlay is not None:
+            holders.append(("game/overlay", [overlay]))
+        return holders
+
+    def _owners(self, game: "Game", holders: list[Holder]) -> Iterator[tuple[str, Surface, bool]]:
+        """Every surface of every holder, and whether the holder owns it"""
+        owned: set[int] = set()
+        for name, values in holders:
+            # Backgrounds keep the screen to know their size, it's only counted once for itself
+            excluded = () if name == "screen" else (game.screen,)
+            for surface in find_surfaces(values, excluded=excluded):
+                yield name, surface, id(surface) not in owned
+                owned.add(id(surface))
+
+    def snapshot(self, game: "Game") -> dict[str, tuple[int, int]]:
+        tally: dict[str, list[int]] = {}
+        for name, surface, owner in self._owners(game, self.holders(game)):
+            counts = tally.setdefault(name, [0, 0])
+            size = surface_bytes(surface)
+            counts[1] += size
+            if owner:
+                counts[0] += size
+        return {name: (own, referenced) for name, (own, referenced) in tally.items()}
+
+    def level_switched(self, game: "Game", old_level: "Level | None"):
+        # The level just left is still referenced by the caller, it's checked on the next switch
+        if self.leak_check:
+            self.check_leaks(game)
+            if old_level is not None:
+                self.remember(game, old_level)
+        if not self.log_switches:
+            return
+        snapshot = self.snapshot(game)
+        resident = resident_bytes()
+        logger.info(
+            f"Surfaces: {megabytes(sum(own for own, _ in snapshot.values()))}, "
+            f"asset cache {megabytes(snapshot['cache/assets'][0])}"
+            + (f", resident {megabytes(resident)}" if resident is not None else ""))
+
+    def remember(self, game: "Game", level: "Level"):
+        """Keep weak references to the surfaces only the level owns"""
+        shared = [holder for holder in self.holders(game) if holder[0].startswith(("screen", "cache/"))]
+        for name, surface, owner in self._owners(game, shared + level_holders(level)):
+            if owner and not name.startswith(("screen", "cache/")):
+                self._surfaces.append((name, weakref.ref(surface), surface_bytes(surface)))
+        self._levels.append((type(level).__name__, weakref.ref(level)))
+
+    def check_leaks(self, game: "Game"):
+        if not self._levels and not self._surfaces:
+            return
+        # The lambdas of a level referencing the level make cycles only the collector frees
+        gc.collect()
+        for name, ref in self._levels:
+            level = ref()
+            if level is not None:
+                # Frozen objects aren't searched for referrers, collections go through everything from now on
+                self.unfreeze()
+                referrers = sorted({type(referrer).__name__ for referrer in gc.get_referrers(level)})
+                logger.warning(f"{name} is still alive after the game left it, referenced by {referrers}")
+        in_use = {id(surface) for _, surface, _ in self._owners(game, self.holders(game))}
+        leaked: dict[str, list[int]] = {}
+        for name, ref, size in self._surfaces:
+            surface = ref()
+            # Surfaces taken over by the current level or a cache aren't leaks
+            if surface is not None and id(surface) not in in_use:
+                counts = leaked.setdefault(name, [0, 0])
+                counts[0] += 1
+                counts[1] += size
+        if leaked:
+            total = sum(size for _, size in leaked.values())
+            logger.warning(f"{sum(count for count, _ in leaked.values())} surfaces of levels left are still alive, "
+                           f"{megabytes(total)}: " + ", ".join(
+                               f"{name} {count} ({megabytes(size)})"
+                               for name, (count, size) in sorted(leaked.items(), key=lambda item: -item[1][1])))
+        # Each leak is reported once
+        self._levels.clear()
+        self._surfaces.clear()
+
+    def dump(self, game: "Game", top: int = memory_dump_top) -> list[str]:
+        snapshot = self.snapshot(game)
+        holders = sorted(snapshot.items(), key=lambda item: (-item[1][0], -item[1][1]))
+        lines = [f"{'holder':<48}{'own':>12}{'referenced':>12}"]
+        lines += [f"{name:<48}{megabytes(own):>12}{megabytes(referenced):>12}"
+                  for name, (own, referenced) in holders[:top]]
+        resident = resident_bytes()
+        lines.append(f"Total {megabytes(sum(own for own, _ in snapshot.values()))} in surfaces"
+                     + (f", resident {megabytes(resident)}" if resident is not None else ""))
+        logger.info("Surface memory\n" + "\n".join(lines))
+        return lines
+
+
+memory = MemoryTracker()
@@ -1,23 +1,40 @@
-from typing import Dict
+from typing import Dict, List, Tuple
+import pygame
 from pygame.rect import Rect
-from pygame.transform import scale
-from pygame.image import load
+from pygame.sprite import Sprite
+from .assets import assets
+from .render import LayeredRenderer, LAYER_OVERLAY
+from .events import EventBus
 from .logger import get_logger
 from .game_state import game_state
-from .screen import screen
 
 logger = get_logger(__name__)
 
 
-class OverlayObject:
+class OverlayObject(Sprite):
     def __init__(self) -> None:
+        super().__init__()
         self.visible = False
         self.z_index = 0
-        self.events = []
+        # Event bus of the overlay holding the object, see `subscribe`
+        self.events: EventBus | None = None
+
+    def layered_sprites(self) -> List[Tuple[Sprite, int]]:
+        """Sprites to draw for this object, with their layer. Sprites are drawn from their image and rect"""
+        return [(self, LAYER_OVERLAY + self.z_index)]
 
-    def draw(self):
+    def update(self):
+        """Update the sprites once per frame before they're drawn"""
         pass
 
+    def subscribe(self, events: EventBus):
+        """Called when the object is added to an overlay, subscribe to the events it handles here"""
+        self.events = events
+
+    def unsubscribe(self, events: EventBus):
+        """Called when the object is removed from its overlay"""
+        self.events = None
+
     def set_visible(self, visible: bool):
         self.visible = visible
         return self
@@ -26,20 +43,25 @@ class OverlayObject:
 class Heart(OverlayObject):
     def __init__(self, h: int = 100, w: int = 100) -> None:
         super().__init__()
-        self.rect = Rect(10, 10, w, h)
+        self.heart_rect = Rect(10, 10, w, h)
         self.visible = True
-        self.surface = scale(load("assets/common/heart.png"), self.rect.size)
+        self.surface = assets.load("assets/common/heart.png", self.heart_rect.size)
         self.z_index = 10
+        self._hearts = -1
+        self.update()
 
-    def draw(self):
-        if not self.visible:
-            return
+    def update(self):
         if game_state.hearts < 0:
             game_state.hearts = 0
-        elif game_state.hearts > 0:
-            for i in range(game_state.hearts):
-                screen.blit(self.surface, Rect(self.rect.x + i *
-                            self.rect.w, self.rect.y, self.rect.w, self.rect.h))
+        if game_state.hearts == self._hearts:
+            return
+        # One row of hearts, rebuilt only when the number of hearts changes
+        self._hearts = game_state.hearts
+        self.rect = Rect(self.heart_rect.topleft,
+                         (self.heart_rect.w * self._hearts, self.heart_rect.h))
+        self.image = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        for i in range(self._hearts):
+            self.image.blit(self.surface, (i * self.heart_rect.w, 0))
 
     def hide(self):
         self.visible = False
@@ -49,24 +71,38 @@ class Heart(OverlayObject):
 
 
 class ScreenOverlay:
-    def __init__(self) -> None:
+    def __init__(self, renderer: LayeredRenderer | None = None, events: EventBus | None = None) -> None:
         self.overlay_objects: Dict[str, OverlayObject] = dict()
+        # Overlay objects are drawn by the renderer at LAYER_OVERLAY + z_index
+        self.renderer = renderer if renderer is not None else LayeredRenderer()
+        # Overlay objects subscribe to the events they handle while they're added
+        self.events = events if events is not None else EventBus()
         self.visible = False
         self.is_fullscreen_open = False
-        self.events = []
 
-    def draw(self):
-        # sort overlay objects by z-index, more z-index means latter draw
-        for key in sorted(self.overlay_objects.keys(), key=lambda x: self.overlay_objects[x].z_index):
-            self.overlay_objects[key].events = self.events
-            self.overlay_objects[key].draw()
+    def update(self):
+        for obj in self.overlay_objects.values():
+            obj.update()
 
     def add(self, key, obj: OverlayObject):
+        self.remove(key)
         self.overlay_objects[key] = obj
+        for sprite, layer in obj.layered_sprites():
+            self.renderer.add(sprite, layer=layer)
+        obj.subscribe(self.events)
         return self
 
     def remove(self, key):
-        self.overlay_objects.pop(key, None)
+        obj = self.overlay_objects.pop(key, None)
+        if obj is not None:
+            self.renderer.remove(*(sprite for sprite, _ in obj.layered_sprites()))
+            obj.unsubscribe(self.events)
+        return self
+
+    def clear(self):
+        """Remove every object, unsubscribing them from the events"""
+        for key in list(self.overlay_objects):
+            self.remove(key)
         return self
 
     def set_visible(self, visible: bool):
@@ -90,6 +126,8 @@ class ScreenOverlay:
     def has_element(self, key):
         return key in self.overlay_objects
 
+    def get_element(self, key) -> OverlayObject | None:
+        return self.overlay_objects.get(key)
+
     def set_element(self, key, obj: OverlayObject):
-        self.overlay_objects[key] = obj
-        return self
+        return self.add(key, obj)
@@ -1,22 +1,26 @@
+import logging
 import pygame
 import math
 from typing import Literal
 from .color import BLUE, WHITE, PURPLE, GREEN
-from .helper import scale_fit
-from .screen import WIDTH, HEIGHT, screen
+from .screen import get_screen, init_display
 from .setting import player_debug, show_player_position, player_speed, walkable_debug
 from .background import WalkableTile
+from .assets import assets
+from .inputs import inputs
 from .logger import get_logger
 
 logger = get_logger(__name__)
 
+Facing = Literal['down', 'up', 'left', 'right']
+
 
 class Player(pygame.sprite.Sprite):
     def __init__(self, init_pos: tuple[int, int], width_height: tuple[int, int] = (225, 225)):
         super().__init__()
         self._image = pygame.Surface((40, 40))
         self.speed = player_speed
-        self.facing: Literal['down', 'up', 'left', 'right'] = "down"
+        self._facing: Facing = "down"
         self._rect = pygame.Rect(init_pos, width_height)
         self.facing_image = {
             "up": self.load_image_fit_rect("assets/characters/bunny/face-up.png"),
@@ -24,25 +28,58 @@ class Player(pygame.sprite.Sprite):
             "left": self.load_image_fit_rect("assets/characters/bunny/face-left.png"),
             "right": self.load_image_fit_rect("assets/characters/bunny/face-right.png"),
         }
+        # The rect is the size of the image of the facing direction
+        self._rect.size = self.image.get_size()
         self.walkable_mask: WalkableTile | None = None
         self.debug = player_debug
+        self.visible = True
+        # Position before the last simulation step, drawn positions are interpolated from it
+        self.previous_rect = self._rect.copy()
+        self.alpha = 1.0
 
     def load_image_fit_rect(self, filename):
-        image = pygame.image.load(filename).convert_alpha()
-        return scale_fit(image, self._rect)[0]
+        return assets.load_fit(filename, self._rect)[0]
 
-    def draw(self, screen):
-        if show_player_position:
-            logger.debug(f"Player position: {self.rect.topleft}")
-        screen.blit(self.image, self.rect)
+    def update(self, controllable: bool = True):
+        """Advance the player by one fixed simulation step
+
+        Args:
+            controllable (bool, optional): Move the player with the keyboard. Defaults to True.
+        """
+        self.previous_rect = self.rect.copy()
+        if controllable:
+            self.handle_keys()
+
+    def snap(self):
+        """Draw the player at its position without interpolating, after a teleport"""
+        self.previous_rect = self.rect.copy()
+
+    @property
+    def draw_rect(self) -> pygame.Rect:
+        """The rect drawn, `alpha` of the way from the previous step to the current one"""
+        rect = self.rect.copy()
+        if self.alpha < 1:
+            rect.x = round(self.previous_rect.x +
+                           (rect.x - self.previous_rect.x) * self.alpha)
+            rect.y = round(self.previous_rect.y +
+                           (rect.y - self.previous_rect.y) * self.alpha)
+        return rect
+
+    def draw(self, screen) -> pygame.Rect:
+        dirty_rect = screen.blit(self.image, self.draw_rect)
+        self.draw_debug(screen)
+        return dirty_rect
+
+    def draw_debug(self, screen):
         if self.debug:
-            pygame.draw.rect(screen, BLUE, self.rect, 2)
+            pygame.draw.rect(screen, BLUE, self.draw_rect, 2)
 
     def move(self, dx, dy):
         # Calculate new potential position for feet and upper body
         new_rect = self.rect.move(dx, dy)
         if not self.is_within_walkable_mask(new_rect):
             return
+        screen = get_screen()
         if self.is_within_screen(screen, new_rect):
             self.rect = new_rect
         else:
@@ -60,7 +97,7 @@ class Player(pygame.sprite.Sprite):
         return self.walkable_mask.is_walkable(self.to_foot_rect(new_rect))
 
     def handle_keys(self):
-        keys = pygame.key.get_pressed()
+        keys = inputs.get_pressed()
         dx, dy = 0, 0
 
         if keys[pygame.K_LEFT] or keys[pygame.K_a]:
@@ -76,12 +113,23 @@ class Player(pygame.sprite.Sprite):
             dy = self.speed
             self.facing = "down"
         self.move(dx, dy)
+        # Runs every simulation step, skip formatting when debug logs are off
+        if show_player_position and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Player position: {self.rect.topleft}")
+
+    @property
+    def facing(self) -> Facing:
+        return self._facing
+
+    @facing.setter
+    def facing(self, facing: Facing):
+        if facing != self._facing:
+            self._facing = facing
+            self._rect.size = self.image.get_size()
 
     @property
     def image(self):
-        self._rect.width = self.facing_image[self.facing].get_width()
-        self._rect.height = self.facing_image[self.facing].get_height()
-        return self.facing_image[self.facing]
+        return self.facing_image[self._facing]
 
     @property
     def rect(self):
@@ -99,20 +147,18 @@ class Player(pygame.sprite.Sprite):
         rect.top = new_rect.bottom
         # draw the foot rect
         if self.debug:
-            pygame.draw.rect(screen, WHITE, rect, 2)
+            pygame.draw.rect(get_screen(), WHITE, rect, 2)
         return rect
 
 
 if __name__ == "__main__":
     pygame.init()
-    WIDTH = 800
-    HEIGHT = 600
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    screen = init_display()
     player = Player((100, 100))
     running = True
     while running:
         screen.fill(WHITE)
-        for event in pygame.event.get():
+        for event in inputs.poll(1 / 60).events:
             if event.type == pygame.QUIT:
                 running = False
                 pygame.quit()
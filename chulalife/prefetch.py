@@ -0,0 +1,89 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING
+from .setting import prefetch_workers
+from .logger import get_logger
+
+if TYPE_CHECKING:
+    from .game import Game
+    from .levels import Level
+
+logger = get_logger(__name__)
+
+
+class LevelPrefetcher:
+    """
+    Builds levels on a thread pool ahead of time.
+
+    Constructing a level decodes its images, so `Game.switch_level` asks the
+    prefetcher for a ready-made level instead of building it on the game loop.
+    A level that hasn't started building is cancelled and built synchronously.
+    A level that is being built is waited for, its images are already being
+    decoded and a second copy would only compete with the worker. Levels
+    prefetched but not played next are dropped on each switch with `keep_only`.
+
+    Args:
+        game (Game): The game the levels are built for
+        max_workers (int): Number of worker threads
+
+    Methods:
+        prefetch(level_class): Start building a level in the background
+        take(level_class): Get the prefetched level, or build it now
+        keep_only(level_class): Drop the other prefetched levels
+        submit(fn, *args): Run any other loading work on the worker threads
+        prefetched(): The levels built and not taken yet
+        shutdown(): Stop the worker threads
+    """
+
+    def __init__(self, game: "Game", max_workers: int = prefetch_workers) -> None:
+        self.game = game
+        self._executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="prefetch")
+        self._pending: dict[type["Level"], Future["Level"]] = {}
+
+    def prefetch(self, level_class: type["Level"]):
+        if level_class in self._pending:
+            return
+        logger.debug(f"Prefetching {level_class.__name__}")
+        self._pending[level_class] = self._executor.submit(
+            self._build, level_class)
+
+    def take(self, level_class: type["Level"]) -> "Level":
+        future = self._pending.pop(level_class, None)
+        if future is None:
+            logger.debug(f"{level_class.__name__} not prefetched, loading now")
+        elif future.cancel():
+            logger.debug(f"{level_class.__name__} not prefetched yet, loading now")
+        else:
+            begin = time.perf_counter()
+            try:
+                level = future.result()
+            except Exception as e:
+                logger.error(f"Prefetching {level_class.__name__} failed: {e}")
+            else:
+                logger.debug(f"Using prefetched {level_class.__name__}, "
+                             f"waited {time.perf_counter() - begin:.3f} s")
+                return level
+        return level_class(self.game)
+
+    def keep_only(self, level_class: type["Level"] | None):
+        """Drop the prefetched levels other than level_class, cancelling the ones not started"""
+        for other in list(self._pending):
+            if other is not level_class:
+                self._pending.pop(other).cancel()
+
+    def prefetched(self) -> list["Level"]:
+        return [future.result() for future in list(self._pending.values())
+                if future.done() and future.exception() is None]
+
+    def submit(self, fn, *args) -> Future:
+        return self._executor.submit(fn, *args)
+
+    def _build(self, level_class: type["Level"]) -> "Level":
+        level = level_class(self.game)
+        level.load_scene(level.current_scene)
+        return level
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._pending.clear()
@@ -0,0 +1,186 @@
+import os
+import csv
+import json
+import time
+from collections import deque
+from contextlib import nullcontext
+from pygame.rect import Rect
+from pygame.surface import Surface
+
+# Internal imports
+from .color import BLACK, WHITE
+from .setting import profiler_enabled, profiler_frames, profiler_output_dir
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# (phase name, start, duration) in seconds from `time.perf_counter`
+Sample = tuple[str, float, float]
+
+_NO_PHASE = nullcontext()
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: "FrameProfiler", name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        if self.profiler._current is not None:
+            self.profiler._current.append(
+                (self.name, self.start, end - self.start))
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Nearest rank percentile of already sorted values"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1,
+                      round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+class FrameProfiler:
+    """
+    Times the phases of every frame into a ring buffer of the last frames.
+
+    Code measures a phase with `with profiler.phase("name"):`. While the
+    profiler is disabled `phase` returns a shared no-op context manager, so
+    the hooks stay in the game loop at almost no cost.
+
+    Args:
+        capacity (int): Number of frames kept, older frames are dropped
+        enabled (bool): Record timings
+
+    Methods:
+        phase(name): Context manager timing a phase of the current frame
+        begin_frame(): Start recording a frame
+        end_frame(): Store the recorded frame in the ring buffer
+        summary(): p50/p95/p99 milliseconds of each phase
+        draw_hud(screen): Draw the summary on the screen
+        export_csv(file_name): Write every sample as a row
+        export_trace(file_name): Write Chrome trace events, open in chrome://tracing or Perfetto
+        export(): Write both files into `profiler_output_dir`
+    """
+
+    def __init__(self, capacity: int = profiler_frames, enabled: bool = profiler_enabled) -> None:
+        self.enabled = enabled
+        self.show_hud = False
+        self.frames: deque[tuple[int, list[Sample]]] = deque(maxlen=capacity)
+        self.frame_count = 0
+        self._current: list[Sample] | None = None
+        self._frame_start = 0.0
+        self._phases: dict[str, _Phase] = {}
+        self._hud: Surface | None = None
+        # Rebuilding the HUD sorts every sample, do it a few times per second
+        self.hud_interval = 30
+
+    def phase(self, name: str):
+        if not self.enabled:
+            return _NO_PHASE
+        phase = self._phases.get(name)
+        if phase is None:
+            phase = self._phases[name] = _Phase(self, name)
+        return phase
+
+    def begin_frame(self):
+        self._current = [] if self.enabled else None
+        if self.enabled:
+            self._frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if self._current is not None:
+            self._current.append(
+                ("frame", self._frame_start, time.perf_counter() - self._frame_start))
+            self.frames.append((self.frame_count, self._current))
+            self._current = None
+        self.frame_count += 1
+
+    def toggle_hud(self):
+        """Show or hide the HUD, profiling is enabled while it's shown"""
+        self.show_hud = not self.show_hud
+        if self.show_hud:
+            self.enabled = True
+        self._hud = None
+
+    def clear(self):
+        self.frames.clear()
+        self._hud = None
+
+    def summary(self) -> dict[str, tuple[float, float, float]]:
+        """p50, p95 and p99 of each phase in milliseconds, a phase that ran several times in a frame is summed"""
+        per_frame: dict[str, list[float]] = {}
+        for _, samples in self.frames:
+            totals: dict[str, float] = {}
+            for name, _, duration in samples:
+                totals[name] = totals.get(name, 0.0) + duration
+            for name, total in totals.items():
+                per_frame.setdefault(name, []).append(total * 1000)
+        summary = {}
+        for name, durations in per_frame.items():
+            durations.sort()
+            summary[name] = (percentile(durations, 50),
+                             percentile(durations, 95), percentile(durations, 99))
+        return summary
+
+    def draw_hud(self, screen: Surface) -> Rect | None:
+        """Draw the summary on the top right corner, returns the rect drawn"""
+        if not self.show_hud:
+            return None
+        if self._hud is None or self.frame_count % self.hud_interval == 0:
+            self._hud = self.render_hud()
+        return screen.blit(self._hud, self._hud.get_rect(topright=(screen.get_width() - 10, 10)))
+
+    def render_hud(self) -> Surface:
+        from .elements import get_font
+
+        font = get_font("content", 22)
+        lines = [f"{'phase':<18}{'p50':>8}{'p95':>8}{'p99':>8}  ms"]
+        lines += [f"{name:<18}{p50:>8.2f}{p95:>8.2f}{p99:>8.2f}"
+                  for name, (p50, p95, p99) in self.summary().items()]
+        rendered = [font.render(line, True, WHITE) for line in lines]
+        line_height = font.get_linesize()
+        hud = Surface((max(line.get_width() for line in rendered) + 20,
+                       line_height * len(rendered) + 20))
+        hud.fill(BLACK)
+        for i, line in enumerate(rendered):
+            hud.blit(line, (10, 10 + i * line_height))
+        return hud
+
+    def export_csv(self, file_name: str):
+        with open(file_name, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "phase", "start_ms", "duration_ms"])
+            for frame, samples in self.frames:
+                for name, start, duration in samples:
+                    writer.writerow(
+                        [frame, name, f"{start * 1000:.3f}", f"{duration * 1000:.3f}"])
+
+    def export_trace(self, file_name: str):
+        events = [
+            {"name": name, "cat": "frame", "ph": "X", "pid": 1, "tid": 1,
+             "ts": start * 1e6, "dur": duration * 1e6, "args": {"frame": frame}}
+            for frame, samples in self.frames
+            for name, start, duration in samples
+        ]
+        with open(file_name, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def export(self, output_dir: str = profiler_output_dir) -> tuple[str, str]:
+        os.makedirs(output_dir, exist_ok=True)
+        name = os.path.join(output_dir, time.strftime("profile-%Y%m%d-%H%M%S"))
+        self.export_csv(f"{name}.csv")
+        self.export_trace(f"{name}.json")
+        logger.info(
+            f"Exported {len(self.frames)} frames to {name}.csv and {name}.json")
+        return f"{name}.csv", f"{name}.json"
+
+
+profiler = FrameProfiler()
@@ -1,12 +1,17 @@
+import logging
 import pygame
 import pygame.event
 from typing import Literal
-from pygame.image import load
 from pygame.rect import Rect
-from .screen import screen, WIDTH, HEIGHT
+from .screen import WIDTH, HEIGHT
 from .elements import TextObject
 from .overlay import OverlayObject
-from .setting import charector_interaction
+from .events import EventBus
+from .render import LAYER_OVERLAY, LAYER_OVERLAY_BACKDROP
+from .assets import assets
+from .setting import charector_interaction, answer_feedback_time
+from .scheduler import scheduler
+from .audio import audio
 from .logger import get_logger
 from .color import BLACK, RED
 from .game_state import game_state
@@ -37,7 +42,6 @@ class Question(OverlayObject):
         self.id = question_id
         self.image_file_name = f"assets/scene/text_or_die/question/{
             self.id}.png"
-        self.image = load(self.image_file_name)
         self.rect = Rect(0, 0, WIDTH, HEIGHT)
         self.is_disabled = not charector_interaction
         self.typed_word = ""
@@ -47,52 +51,95 @@ class Question(OverlayObject):
         self.notify_text = ""
         self.notify = TextObject(
             "", (0, HEIGHT // 2 + HEIGHT // 4 + 50), RED, "display", 52)
-        self.status: Literal["active", "done"] = "active"
+        # "correct" while the answer is shown, before the level closes the question
+        self.status: Literal["active", "correct", "done"] = "active"
 
-    def draw(self):
-        if not self.visible:
-            return
-        if self.is_disabled:
+    @property
+    def image(self):
+        # Decoded on first draw, not when the character holding the question is created
+        return assets.load(self.image_file_name, self.rect.size, "opaque")
+
+    def layered_sprites(self):
+        # The question image only changes when the question is opened
+        return [
+            (self, LAYER_OVERLAY_BACKDROP + self.z_index),
+            (self.text_input, LAYER_OVERLAY + self.z_index),
+            (self.notify, LAYER_OVERLAY + self.z_index),
+        ]
+
+    def set_visible(self, visible: bool):
+        if visible and self.is_disabled:
             logger.warning(
                 "Question is disabled by charector_no_interaction setting")
+        super().set_visible(visible and not self.is_disabled)
+        self.update_focus()
+        if self.visible:
+            self.text_input.start_cursor()
+        else:
+            self.text_input.stop_cursor()
+        return self
+
+    def subscribe(self, events: EventBus):
+        super().subscribe(events)
+        self.update_focus()
+
+    def unsubscribe(self, events: EventBus):
+        events.release_focus(self.handle_event)
+        self.text_input.stop_cursor()
+        # A question removed while it shows the answer never finishes
+        scheduler.cancel(self)
+        super().unsubscribe(events)
+
+    def update_focus(self):
+        """Type into the question while it's open"""
+        if self.events is None:
+            return
+        if self.visible:
+            self.events.take_focus(self.handle_event)
+        else:
+            self.events.release_focus(self.handle_event)
+
+    def update(self):
+        self.text_input.visible = self.visible
+        self.notify.visible = False
+        if not self.visible:
             return
-        self.handle_events()
         self.text_input.update_text(self.typed_word)
-        self.text_input.update_cursor()
-        screen.blit(self.image, self.rect)
         self.notify.update_text(self.notify_text)
-        if self.notify_text and self.typed_word == "":
-            self.notify.draw(screen)
-        self.text_input.draw(screen)
-        if self.status == "done":
-            self.notify_text = ""
-            pygame.time.wait(500)
+        self.notify.visible = bool(self.notify_text) and self.typed_word == ""
 
     def check_answer(self):
         if self.typed_word == self.correct_word:
             return True
         return False
 
-    def handle_events(self):
-        logger.info(f"Event: {self.events}")
-        for event in self.events:
-            if not self.visible or self.is_disabled:
+    def handle_event(self, event: pygame.event.Event):
+        """Keyboard focus handler, receives the keyboard events while the question is open"""
+        if not self.visible or self.is_disabled or self.status != "active" or event.type != pygame.KEYDOWN:
+            return
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Event: {event}")
+        if event.key == pygame.K_BACKSPACE:
+            self.typed_word = self.typed_word[:-1]
+        elif event.key == pygame.K_RETURN:
+            if self.typed_word == "":
                 return
-            if event.type == pygame.KEYDOWN:
-                logger.info(f"Event: {event}")
-                if event.key == pygame.K_BACKSPACE:
-                    self.typed_word = self.typed_word[:-1]
-                elif event.key == pygame.K_RETURN:
-                    if self.typed_word == "":
-                        return
-                    if not self.check_answer():
-                        game_state.hearts -= 1
-                        self.typed_word = ""
-                        self.notify_text = f"Incorrect word! {
-                            game_state.hearts} hearts left"
-                    else:
-                        self.notify_text = "Yes Correct!!!"
-                        self.status = "done"
-                        self.typed_word = ""
-                elif event.unicode.isalpha() or event.unicode == "-":
-                    self.typed_word += event.unicode.upper()
+            if not self.check_answer():
+                game_state.hearts -= 1
+                audio.play("wrong")
+                self.typed_word = ""
+                self.notify_text = f"Incorrect word! {
+                    game_state.hearts} hearts left"
+            else:
+                self.notify_text = "Yes Correct!!!"
+                audio.play("correct")
+                self.status = "correct"
+                self.typed_word = ""
+                # Show the answer for a moment, then let the level close the question
+                scheduler.after(answer_feedback_time, self.finish, owner=self)
+        elif event.unicode.isalpha() or event.unicode == "-":
+            self.typed_word += event.unicode.upper()
+
+    def finish(self):
+        self.notify_text = ""
+        self.status = "done"
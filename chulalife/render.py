@@ -0,0 +1,96 @@
+import pygame
+from pygame.rect import Rect
+from pygame.surface import Surface
+from pygame.sprite import LayeredUpdates
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class DirtyRectRenderer:
+    """
+    Presents only the parts of the screen that changed since the last frame.
+
+    A level draws the parts of a frame that rarely change (background, objects
+    and fullscreen overlays) once, and the renderer keeps a copy of them as the
+    backdrop. On the following frames the level only restores the backdrop
+    under the rects drawn on the previous frame, draws the moving parts and
+    marks the rects it drew. `present` then updates the previous and current
+    rects instead of flipping the whole display.
+
+    Methods:
+        invalidate(): Redraw and present the whole screen on the next frame
+        capture(screen): Keep the screen content as the backdrop
+        restore(screen): Erase the rects drawn on the previous frame
+        mark(rects): Add rects drawn on the current frame
+        present(): Update the changed parts of the display
+    """
+
+    def __init__(self) -> None:
+        self.backdrop: Surface | None = None
+        self.full_update = True
+        self.previous_rects: list[Rect] = []
+        self.current_rects: list[Rect] = []
+
+    @property
+    def needs_redraw(self) -> bool:
+        return self.backdrop is None
+
+    def invalidate(self):
+        self.backdrop = None
+
+    def capture(self, screen: Surface):
+        self.backdrop = screen.copy()
+        self.full_update = True
+
+    def restore(self, screen: Surface):
+        if self.backdrop is None:
+            return
+        for rect in self.previous_rects:
+            screen.blit(self.backdrop, rect, rect)
+
+    def mark(self, rects: list[Rect]):
+        self.current_rects.extend(rects)
+
+    def present(self):
+        if self.full_update:
+            pygame.display.flip()
+            self.full_update = False
+        else:
+            pygame.display.update(self.previous_rects + self.current_rects)
+        self.previous_rects = self.current_rects
+        self.current_rects = []
+
+
+# Sprite layers, overlay objects are drawn at their layer + z_index
+LAYER_BACKGROUND = 0
+LAYER_OBJECTS = 100
+LAYER_OVERLAY_BACKDROP = 200
+LAYER_PLAYER = 300
+LAYER_BUTTONS = 400
+LAYER_OVERLAY = 500
+
+
+class LayeredRenderer(LayeredUpdates):
+    """
+    Sprite group drawing each layer with a single batched blit.
+
+    The sprites are kept sorted by layer as they are added and removed, so
+    drawing never sorts. Sprites are drawn from their `image` and `rect`, or
+    their `draw_rect` when they interpolate their position between simulation
+    steps, and skipped while their `visible` attribute is False.
+
+    Methods:
+        draw_layers(surface, start, stop): Draw the layers in [start, stop) and return the rects drawn
+    """
+
+    def draw_layers(self, surface: Surface, start: int = LAYER_BACKGROUND, stop: int | None = None) -> list[Rect]:
+        dirty_rects = []
+        for layer in self.layers():
+            if layer < start or (stop is not None and layer >= stop):
+                continue
+            dirty_rects.extend(surface.blits(
+                [(sprite.image, getattr(sprite, "draw_rect", sprite.rect))
+                 for sprite in self.get_sprites_from_layer(layer) if sprite.visible]
+            ))
+        return dirty_rects
@@ -0,0 +1,192 @@
+import heapq
+import itertools
+from typing import Any, Callable
+
+# Internal imports
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+Easing = Callable[[float], float]
+
+
+def linear(t: float) -> float:
+    return t
+
+
+def ease_in_out(t: float) -> float:
+    """Slow start and end, smoothstep"""
+    return t * t * (3 - 2 * t)
+
+
+def ease_out(t: float) -> float:
+    """Fast start, slow end"""
+    return 1 - (1 - t) * (1 - t)
+
+
+class Timer:
+    """
+    A callback run by the scheduler after a delay, then every interval if it repeats.
+
+    Args:
+        callback (Callable[[], Any]): Function to call
+        due (float): Scheduler time of the next call
+        interval (float | None): Seconds between calls, None to call once
+        owner (object, optional): Object the timer belongs to, see `Scheduler.cancel`
+    """
+    __slots__ = ("callback", "due", "interval", "owner", "active")
+
+    def __init__(self, callback: Callable[[], Any], due: float, interval: float | None, owner: object = None) -> None:
+        self.callback = callback
+        self.due = due
+        self.interval = interval
+        self.owner = owner
+        self.active = True
+
+    def cancel(self):
+        self.active = False
+
+
+class Tween:
+    """
+    A value moving from start to end over a duration, passed to setter every step.
+
+    Args:
+        setter (Callable[[float], Any]): Called with the current value
+        start (float): Value at the beginning
+        end (float): Value at the end
+        duration (float): Seconds from start to end
+        easing (Easing, optional): Shape of the motion, maps 0..1 to 0..1. Defaults to linear.
+        on_done (Callable[[], Any] | None, optional): Called once the end value is set. Defaults to None.
+        owner (object, optional): Object the tween belongs to, see `Scheduler.cancel`
+    """
+    __slots__ = ("setter", "start", "end", "duration", "easing", "on_done", "owner", "elapsed", "active")
+
+    def __init__(self, setter: Callable[[float], Any], start: float, end: float, duration: float,
+                 easing: Easing = linear, on_done: Callable[[], Any] | None = None, owner: object = None) -> None:
+        self.setter = setter
+        self.start = start
+        self.end = end
+        self.duration = duration
+        self.easing = easing
+        self.on_done = on_done
+        self.owner = owner
+        self.elapsed = 0.0
+        self.active = True
+
+    @property
+    def value(self) -> float:
+        t = 1.0 if self.duration <= 0 else min(self.elapsed / self.duration, 1.0)
+        return self.start + (self.end - self.start) * self.easing(t)
+
+    def advance(self, dt: float) -> bool:
+        """Move the tween forward, returns whether it's still running"""
+        self.elapsed += dt
+        self.setter(self.value)
+        if self.elapsed < self.duration:
+            return True
+        self.active = False
+        if self.on_done is not None:
+            self.on_done()
+        return False
+
+    def cancel(self):
+        self.active = False
+
+
+class Scheduler:
+    """
+    Delayed callbacks, repeating timers and tweens advanced by the game loop.
+
+    Nothing waits: code schedules what should happen later and `Game.run`
+    calls `update` once per simulation step, so the loop keeps drawing,
+    reading input and playing music meanwhile. Time only moves with
+    `update`, a replayed recording fires the timers on the same steps.
+
+    Timers are kept in a heap by due time, a step with nothing due only
+    looks at the top of the heap.
+
+    Methods:
+        after(delay, callback): Call callback once in delay seconds
+        every(interval, callback): Call callback every interval seconds
+        tween(duration, setter, start, end): Move a value over a duration
+        cancel(owner): Cancel the timers and tweens of an owner
+        update(dt): Advance the time and run what's due
+        clear(): Cancel everything and restart the time
+    """
+
+    def __init__(self) -> None:
+        self.time = 0.0
+        self._timers: list[tuple[float, int, Timer]] = []
+        self._tweens: list[Tween] = []
+        # Orders timers due at the same time by when they were scheduled
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return sum(timer.active for _, _, timer in self._timers) + len(self._tweens)
+
+    def _push(self, timer: Timer):
+        heapq.heappush(self._timers, (timer.due, next(self._counter), timer))
+
+    def after(self, delay: float, callback: Callable[[], Any], owner: object = None) -> Timer:
+        timer = Timer(callback, self.time + delay, None, owner)
+        self._push(timer)
+        return timer
+
+    def every(self, interval: float, callback: Callable[[], Any], owner: object = None,
+              delay: float | None = None) -> Timer:
+        """Call callback every interval seconds, the first time after delay which defaults to interval"""
+        if interval <= 0:
+            raise ValueError(f"Timer interval must be positive, got {interval}")
+        timer = Timer(callback, self.time + (interval if delay is None else delay), interval, owner)
+        self._push(timer)
+        return timer
+
+    def tween(self, duration: float, setter: Callable[[float], Any], start: float = 0.0, end: float = 1.0,
+              easing: Easing = linear, on_done: Callable[[], Any] | None = None, owner: object = None) -> Tween:
+        tween = Tween(setter, start, end, duration, easing, on_done, owner)
+        setter(start)
+        self._tweens.append(tween)
+        return tween
+
+    def cancel(self, owner: object):
+        for _, _, timer in self._timers:
+            if timer.owner is owner:
+                timer.active = False
+        for tween in self._tweens:
+            if tween.owner is owner:
+                tween.active = False
+
+    def update(self, dt: float):
+        self.time += dt
+        timers = self._timers
+        while timers and timers[0][0] <= self.time:
+            _, _, timer = heapq.heappop(timers)
+            if not timer.active:
+                continue
+            if timer.interval is not None:
+                # Scheduled from the due time, so a repeating timer doesn't drift
+                timer.due += timer.interval
+                self._push(timer)
+            else:
+                timer.active = False
+            timer.callback()
+        if self._tweens:
+            # Tweens started by a tween finishing in this step begin on the next one
+            running, self._tweens = self._tweens, []
+            running = [tween for tween in running
+                       if tween.active and tween.advance(dt) and tween.active]
+            self._tweens = running + self._tweens
+
+    def clear(self):
+        for _, _, timer in self._timers:
+            timer.active = False
+        for tween in self._tweens:
+            tween.active = False
+        self._timers.clear()
+        self._tweens.clear()
+        # Replays fire the timers on the same steps from the same start time
+        self.time = 0.0
+
+
+scheduler = Scheduler()
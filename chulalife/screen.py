@@ -1,13 +1,52 @@
+import os
 import pygame
+from pygame.surface import Surface
+from .logger import get_logger
 
-pygame.init()
+logger = get_logger(__name__)
 
+# Size the game is drawn at, the window scales it to the display
 WIDTH = 1920
 HEIGHT = 1080
 
-screen = pygame.display.set_mode(
-    (WIDTH, HEIGHT), pygame.SCALED | pygame.FULLSCREEN)
-pygame.display.set_caption("Chula Life")
+_screen: Surface | None = None
 
-WIDTH, HEIGHT = pygame.display.get_surface().get_size()
-print(f"Screen size: {WIDTH}x{HEIGHT}")
+
+def init_display(headless: bool = False) -> Surface:
+    """Create the surface the game is drawn on
+
+    Nothing is opened when the package is imported, `Game` creates the display.
+
+    Args:
+        headless (bool, optional): Draw on an off-screen surface with the dummy video
+            and audio drivers instead of opening a fullscreen window, for machines
+            without a display. Defaults to False.
+
+    Returns:
+        Surface: The screen, also returned by `get_screen`
+    """
+    global _screen
+    if headless:
+        if pygame.display.get_init() and pygame.display.get_driver() != "dummy":
+            pygame.display.quit()
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+        pygame.display.init()
+        # Images are converted to the display pixel format, which needs a display mode
+        pygame.display.set_mode((1, 1))
+        _screen = Surface((WIDTH, HEIGHT)).convert()
+    else:
+        pygame.display.init()
+        _screen = pygame.display.set_mode(
+            (WIDTH, HEIGHT), pygame.SCALED | pygame.FULLSCREEN)
+        pygame.display.set_caption("Chula Life")
+    logger.info(f"Screen size: {WIDTH}x{HEIGHT}{' (headless)' if headless else ''}")
+    return _screen
+
+
+def get_screen() -> Surface:
+    """The surface created by `init_display`"""
+    if _screen is None:
+        raise RuntimeError(
+            "The display is not initialised, call init_display() first")
+    return _screen
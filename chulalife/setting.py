@@ -1,13 +1,69 @@
 # Logging level
 logging_level = "INFO"
+# Write log records to stderr from a background thread instead of the game loop
+async_logging: bool = True
+# Most records per second written from one logging call, the others are counted
+log_rate_limit: int = 10
 
 # Game settings
 initial_hearts: int = 3
 FPS: int = 60
+# Simulation steps per second, movement and interactions run at this rate whatever the FPS
+update_rate: int = 60
+# Longest frame time simulated at once, a longer hitch slows the game down instead of skipping ahead
+max_frame_time: float = 0.25
+# Draw on an off-screen surface without opening a window, for machines without a display
+headless: bool = False
+# Only redraw and present the parts of the screen that changed
+dirty_rect_rendering: bool = False
+
+# Asset settings
+# Maximum bytes of decoded images kept in the shared asset cache
+asset_cache_budget: int = 256 * 1024 * 1024
+# Load backgrounds baked by `python -m chulalife.bake` when they are up to date
+use_baked_backgrounds: bool = True
+baked_assets_dir: str = "assets/baked"
+bake_resolutions: list[tuple[int, int]] = [(1920, 1080), (1280, 720)]
+# Draw characters and UI from the atlas baked by `python -m chulalife.bake`
+use_baked_atlas: bool = True
+# Build the next level on worker threads while the current one is played
+prefetch_next_level: bool = True
+prefetch_workers: int = 2
+# Decode the images of the scenes a warp door leads to while the current scene is played
+prefetch_adjacent_scenes: bool = True
+# Images the first screen loaded on the last start, decoded in parallel behind a splash on the next one
+startup_manifest: str = "assets/baked/startup.json"
+startup_workers: int = 4
+
+# Profiler settings, F3 toggles the HUD and F4 exports the recorded frames
+profiler_enabled: bool = False
+# Number of most recent frames kept
+profiler_frames: int = 600
+profiler_output_dir: str = "profiles"
+
+# Memory settings, F5 logs the surfaces holding the most memory
+# Warn when the surfaces of a level are still alive after switching to another level, runs a full collection per switch
+memory_leak_check: bool = False
+# Log the surface and resident memory on every level switch
+memory_log_switches: bool = False
+# Number of holders listed by the F5 dump
+memory_dump_top: int = 15
 
 # Music settings
 background_music: str = "assets/song/RealMan_bg_music.mp3"
 music_volume: float = 0.2
+# Seconds the music of a level fades into the music of the next one
+music_crossfade_time: float = 1.0
+# Music is decoded once into uncompressed files cached here
+audio_cache_dir: str = "assets/baked/audio"
+
+# Sound settings
+sfx_volume: float = 0.5
+# Sound effects playing at once, the oldest one is cut to play a new one
+sfx_channels: int = 8
+mixer_frequency: int = 44100
+# Samples per mixer buffer, smaller starts sounds sooner but can crackle on slow machines
+mixer_buffer_size: int = 512
 
 # Debug options
 player_debug: bool = False
@@ -17,6 +73,7 @@ warpdoor_debug: bool = False
 
 # Player settings
 show_player_position: bool = True
+# Pixels moved per simulation step
 player_speed: int = 20
 
 # Objects settings
@@ -25,8 +82,23 @@ object_debug: bool = False
 # Character settings
 character_show_outline: bool = False
 
+# Size in pixels of the grid cells indexing walkable ways and objects
+spatial_cell_size: int = 128
+# Check walking against a bitmap of the blocked ways instead of their rects
+compile_walkable_masks: bool = True
+# Pixels per bit of the walkable bitmaps, 1 follows the rects exactly
+walkable_mask_cell_size: int = 1
+# Walkable bitmaps generated from mask images are cached here
+walkable_mask_cache_dir: str = "assets/baked/masks"
+
 # Don't limit boundary on walkable tile
 walkable_tile_interactions: bool = True
 
 # Don't open dialog when collided with character
 charector_interaction: bool = True
+# Seconds the answer of a question stays shown before the question closes
+answer_feedback_time: float = 0.5
+# Seconds between two blinks of the text cursor
+cursor_blink_interval: float = 0.5
+# Number of rendered strings kept by the text cache
+text_cache_size: int = 256
@@ -0,0 +1,94 @@
+from typing import Generic, Iterable, TypeVar
+from pygame.rect import Rect
+
+# Internal imports
+from .setting import spatial_cell_size
+
+T = TypeVar("T")
+
+
+class SpatialHash(Generic[T]):
+    """
+    Uniform grid of rects for finding the ones colliding with a rect.
+
+    Every item is stored in the cells its rect overlaps, a query only tests
+    the items of the cells the query rect overlaps. The cost of a query
+    depends on how many rects are near it, not on how many there are.
+
+    Below `linear_limit` items a single `Rect.collidelist` over every rect
+    is faster than looking up cells in Python, so small indexes scan. The
+    scenes of the game have a few dozen rects at most and always scan, the
+    grid is for larger custom maps, see the `spatial_hash_*` benchmarks.
+
+    Args:
+        cell_size (int): Width and height of a cell in pixels
+
+    Methods:
+        insert(rect, item): Add an item covering rect
+        query(rect): Items colliding with rect, in insertion order
+        collides(rect): Whether any item collides with rect
+    """
+
+    # Measured crossover with small sparse rects on a 1920x1080 scene, the grid query wins from about 600 items
+    linear_limit = 640
+
+    def __init__(self, cell_size: int = spatial_cell_size) -> None:
+        self.cell_size = cell_size
+        # Indices and rects of the items overlapping each cell
+        self.cells: dict[tuple[int, int], tuple[list[int], list[Rect]]] = {}
+        self.rects: list[Rect] = []
+        self.items: list[T] = []
+
+    @classmethod
+    def of(cls, items: Iterable[tuple[Rect, T]], cell_size: int = spatial_cell_size) -> "SpatialHash[T]":
+        index = cls(cell_size)
+        for rect, item in items:
+            index.insert(rect, item)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _cell_range(self, rect: Rect) -> tuple[range, range]:
+        size = self.cell_size
+        # A rect touching a cell edge doesn't collide with the next cell
+        return (range(rect.left // size, (rect.right - 1) // size + 1),
+                range(rect.top // size, (rect.bottom - 1) // size + 1))
+
+    def insert(self, rect: Rect, item: T):
+        rect = Rect(rect)
+        index = len(self.items)
+        self.rects.append(rect)
+        self.items.append(item)
+        xs, ys = self._cell_range(rect)
+        for x in xs:
+            for y in ys:
+                indices, rects = self.cells.setdefault((x, y), ([], []))
+                indices.append(index)
+                rects.append(rect)
+
+    def query(self, rect: Rect) -> list[T]:
+        if len(self.rects) < self.linear_limit:
+            return [self.items[i] for i in rect.collidelistall(self.rects)]
+        found = set()
+        xs, ys = self._cell_range(rect)
+        cells = self.cells
+        for x in xs:
+            for y in ys:
+                cell = cells.get((x, y))
+                if cell is not None:
+                    indices = cell[0]
+                    found.update(indices[i] for i in rect.collidelistall(cell[1]))
+        return [self.items[i] for i in sorted(found)]
+
+    def collides(self, rect: Rect) -> bool:
+        if len(self.rects) < self.linear_limit:
+            return rect.collidelist(self.rects) != -1
+        xs, ys = self._cell_range(rect)
+        cells = self.cells
+        for x in xs:
+            for y in ys:
+                cell = cells.get((x, y))
+                if cell is not None and rect.collidelist(cell[1]) != -1:
+                    return True
+        return False
@@ -0,0 +1,122 @@
+import os
+import json
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+import pygame
+from pygame.rect import Rect
+from pygame.surface import Surface
+
+# Internal imports
+from . import started
+from .assets import assets
+from .color import BLACK, WHITE
+from .setting import startup_manifest, startup_workers
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+AssetKey = tuple[str, tuple[int, int] | None, str]
+
+
+def time_since_start() -> float:
+    """Seconds since the package was imported"""
+    return time.perf_counter() - started
+
+
+class StartupLoader:
+    """
+    Decodes the images of the first screen on a thread pool while a splash shows the progress.
+
+    The images loaded while the first screen is built are recorded in a
+    manifest. The next start decodes them all at once on worker threads
+    before the screen is built, while the game imports the rest of its
+    modules, and the screen then finds them in the asset cache. Without a
+    manifest the screen loads its images itself, as before.
+
+    Args:
+        manifest (str): File listing the images as asset cache keys
+        workers (int): Number of decoding threads
+
+    Methods:
+        start(): Start decoding the images of the manifest
+        wait(screen): Draw the splash until they're decoded
+        recording(): Context recording the images loaded into the manifest
+    """
+
+    def __init__(self, manifest: str = startup_manifest, workers: int = startup_workers) -> None:
+        self.manifest = manifest
+        self.workers = workers
+        self.keys = self.read_manifest()
+        self._futures: list[Future] = []
+
+    def read_manifest(self) -> list[AssetKey]:
+        try:
+            with open(self.manifest) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return []
+        # Images removed since the manifest was written are skipped
+        return [(path, tuple(size) if size else None, convert)
+                for path, size, convert in entries if os.path.exists(path)]
+
+    def write_manifest(self, keys: list[AssetKey]):
+        os.makedirs(os.path.dirname(self.manifest), exist_ok=True)
+        with open(self.manifest, "w") as f:
+            json.dump(keys, f)
+        logger.info(f"Wrote {len(keys)} startup images to {self.manifest}")
+
+    def start(self):
+        if not self.keys:
+            return
+        executor = ThreadPoolExecutor(self.workers, thread_name_prefix="startup")
+        self._futures = [executor.submit(assets.load, *key) for key in self.keys]
+        # The threads exit once the queue is empty
+        executor.shutdown(wait=False)
+
+    @property
+    def progress(self) -> float:
+        if not self._futures:
+            return 1.0
+        return sum(future.done() for future in self._futures) / len(self._futures)
+
+    def wait(self, screen: Surface):
+        """Draw the splash until every image of the manifest is decoded"""
+        if not self._futures:
+            return
+        begin = time.perf_counter()
+        screen.fill(BLACK)
+        pending = self._futures
+        while pending:
+            self.draw_splash(screen)
+            # Keep the window responsive, the events stay queued for the game
+            pygame.event.pump()
+            pending = list(wait(pending, timeout=1 / 30).not_done)
+        self.draw_splash(screen)
+        for future, key in zip(self._futures, self.keys):
+            if future.exception() is not None:
+                logger.warning(f"Decoding startup image {key} failed: {future.exception()}")
+        self._futures = []
+        logger.info(f"Decoded {len(self.keys)} startup images in {time.perf_counter() - begin:.3f} s "
+                    f"({time_since_start():.3f} s since start)")
+
+    def draw_splash(self, screen: Surface):
+        width, height = screen.get_size()
+        bar = Rect(0, 0, width // 3, 12)
+        bar.center = (width // 2, height // 2)
+        pygame.draw.rect(screen, WHITE, bar.inflate(8, 8), 2)
+        pygame.draw.rect(screen, WHITE, (bar.x, bar.y, round(bar.w * self.progress), bar.h))
+        pygame.display.flip()
+
+    @contextmanager
+    def recording(self):
+        """Record the images loaded in the block, and update the manifest when they changed"""
+        assets.record = set()
+        try:
+            yield
+            recorded = assets.record
+        finally:
+            assets.record = None
+        keys = sorted(recorded, key=str)
+        if keys != sorted(self.keys, key=str):
+            self.write_manifest(keys)
@@ -0,0 +1,228 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable
+import pygame
+from pygame.font import Font
+from pygame.surface import Surface
+
+# Internal imports
+from .setting import text_cache_size
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+Color = tuple[int, int, int] | tuple[int, int, int, int]
+
+
+class TextCache:
+    """
+    Rendered strings kept by (font, colour, string), least recently used dropped first.
+
+    Text that is shown again, like a message reappearing or a label redrawn
+    with the same string, is rendered by `Font.render` only once. Levels
+    built on prefetch threads render their text too, so the cache is locked.
+
+    Args:
+        capacity (int): Number of rendered strings kept
+
+    Methods:
+        render(font, font_key, text, color): The rendered text, from the cache when possible
+        stats(): Number of entries, hits and misses
+        surfaces(): The cached surfaces
+        clear(): Drop every entry
+    """
+
+    def __init__(self, capacity: int = text_cache_size) -> None:
+        self.capacity = capacity
+        self._surfaces: OrderedDict[tuple, Surface] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font: Font, font_key: Hashable, text: str, color: Color) -> Surface:
+        """Render text like `font.render(text, True, color)`
+
+        Args:
+            font (Font): Font to render with
+            font_key (Hashable): Identifies the font and its size, fonts with the same key must render the same
+            text (str): Text to render
+            color (Color): Text colour
+
+        Returns:
+            Surface: The rendered text, shared, don't draw on it
+        """
+        key = (font_key, tuple(color), text)
+        with self._lock:
+            surface = self._surfaces.get(key)
+            if surface is not None:
+                self.hits += 1
+                self._surfaces.move_to_end(key)
+                return surface
+            self.misses += 1
+        surface = font.render(text, True, color)
+        with self._lock:
+            self._surfaces[key] = surface
+            if len(self._surfaces) > self.capacity:
+                self._surfaces.popitem(last=False)
+        return surface
+
+    def stats(self) -> dict:
+        return {"entries": len(self._surfaces), "hits": self.hits, "misses": self.misses}
+
+    def surfaces(self) -> list[Surface]:
+        with self._lock:
+            return list(self._surfaces.values())
+
+    def clear(self):
+        with self._lock:
+            self._surfaces.clear()
+
+
+class GlyphAtlas:
+    """
+    The glyphs of one font and colour, each rendered once.
+
+    Args:
+        font (Font): Font of the glyphs
+        color (Color): Colour of the glyphs
+    """
+
+    def __init__(self, font: Font, color: Color) -> None:
+        self.font = font
+        self.color = color
+        self.glyphs: dict[str, Surface] = {}
+        # Height of a rendered line, a single glyph renders as tall as a word
+        self.height = font.render(" ", True, color).get_height()
+        # An empty string renders a little shorter
+        self.empty_height = font.render("", True, color).get_height()
+
+    def glyph(self, char: str) -> Surface:
+        surface = self.glyphs.get(char)
+        if surface is None:
+            surface = self.glyphs[char] = self.font.render(char, True, self.color)
+        return surface
+
+
+_atlases: dict[tuple, GlyphAtlas] = {}
+# Text objects are built on the prefetch threads too, two atlases for a key would split its glyphs
+_atlases_lock = threading.Lock()
+
+
+def glyph_atlas(font: Font, font_key: Hashable, color: Color) -> GlyphAtlas:
+    """The shared glyph atlas of a font and colour, see `TextCache.render` for font_key"""
+    key = (font_key, tuple(color))
+    with _atlases_lock:
+        atlas = _atlases.get(key)
+        if atlas is None:
+            atlas = _atlases[key] = GlyphAtlas(font, color)
+    return atlas
+
+
+def glyph_atlases() -> list[GlyphAtlas]:
+    with _atlases_lock:
+        return list(_atlases.values())
+
+
+def clear_glyph_atlases():
+    with _atlases_lock:
+        _atlases.clear()
+
+
+class GlyphLine:
+    """
+    A line of text edited one glyph at a time, for text being typed.
+
+    Changing the text keeps the glyphs of the common prefix and only clears
+    and blits the glyphs after it, typing or deleting a letter blits one
+    glyph instead of rendering the whole word again. Glyphs are placed at
+    their advance without kerning, like `Font.render` for fonts without
+    kerning pairs.
+
+    An optional cursor bar is drawn right after the last glyph.
+
+    Args:
+        atlas (GlyphAtlas): Glyphs to draw with
+        cursor_width (int, optional): Width of the cursor bar, 0 for no cursor. Defaults to 0.
+    """
+
+    def __init__(self, atlas: GlyphAtlas, cursor_width: int = 0) -> None:
+        self.atlas = atlas
+        self.cursor_width = cursor_width
+        self.cursor_visible = False
+        self.text = ""
+        self.height = atlas.height
+        # Left edge of each glyph, then the end of the line
+        self.offsets = [0]
+        self.canvas = Surface((256, self.height), pygame.SRCALPHA)
+        self.canvas.fill((0, 0, 0, 0))
+        self._blank = self.canvas.copy()
+
+    @property
+    def width(self) -> int:
+        return self.offsets[-1]
+
+    @property
+    def size(self) -> tuple[int, int]:
+        """Size of the text without the cursor, like the surface `Font.render` returns"""
+        return (self.width, self.height if self.text else self.atlas.empty_height)
+
+    @property
+    def surface(self) -> Surface:
+        """The line and the cursor area, a view on the canvas valid until the next change"""
+        width, height = self.size
+        return self.canvas.subsurface((0, 0, width + self.cursor_width, height))
+
+    def _grow(self, width: int):
+        canvas = Surface((max(width, self.canvas.get_width() * 2), self.height), pygame.SRCALPHA)
+        canvas.fill((0, 0, 0, 0))
+        canvas.blit(self.canvas, (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+        self.canvas = canvas
+        self._blank = Surface(canvas.get_size(), pygame.SRCALPHA)
+        self._blank.fill((0, 0, 0, 0))
+
+    def _clear(self, x: int, width: int):
+        # Blending with a transparent surface clears many times faster than filling part of a row
+        self.canvas.blit(self._blank, (x, 0), (0, 0, width, self.height),
+                         special_flags=pygame.BLEND_RGBA_MIN)
+
+    def _draw_cursor(self, visible: bool):
+        if self.cursor_width > 0:
+            if visible:
+                self.canvas.fill(self.atlas.color, (self.width, 0, self.cursor_width, self.height))
+            else:
+                self._clear(self.width, self.cursor_width)
+
+    def set_text(self, text: str):
+        if text == self.text:
+            return
+        prefix = 0
+        for old, new in zip(self.text, text):
+            if old != new:
+                break
+            prefix += 1
+        # Clear the glyphs after the common prefix and the cursor
+        kept = self.offsets[prefix]
+        cleared = self.width - kept + self.cursor_width
+        if cleared > 0:
+            self._clear(kept, cleared)
+        del self.offsets[prefix + 1:]
+        x = kept
+        for char in text[prefix:]:
+            glyph = self.atlas.glyph(char)
+            end = x + glyph.get_width()
+            if end + self.cursor_width > self.canvas.get_width():
+                self._grow(end + self.cursor_width)
+            # The area is clear, copy the glyph with its alpha instead of blending it
+            self.canvas.blit(glyph, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            x = end
+            self.offsets.append(x)
+        self.text = text
+        self._draw_cursor(self.cursor_visible)
+
+    def show_cursor(self, visible: bool):
+        if visible != self.cursor_visible:
+            self.cursor_visible = visible
+            self._draw_cursor(visible)
+
+
+text_cache = TextCache()
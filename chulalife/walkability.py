@@ -0,0 +1,112 @@
+import os
+import hashlib
+from typing import Sequence
+import pygame
+from pygame.mask import Mask
+from pygame.rect import Rect
+
+# Internal imports
+from .setting import walkable_mask_cell_size, walkable_mask_cache_dir
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+_filled: dict[tuple[int, int], Mask] = {}
+
+
+def filled_mask(size: tuple[int, int]) -> Mask:
+    """A shared mask of the size with every bit set"""
+    mask = _filled.get(size)
+    if mask is None:
+        mask = _filled[size] = Mask(size, fill=True)
+    return mask
+
+
+def to_cells(rect: Rect, cell_size: int) -> Rect:
+    """The cells a rect touches, in cell coordinates"""
+    left = rect.left // cell_size
+    top = rect.top // cell_size
+    right = -(-rect.right // cell_size)
+    bottom = -(-rect.bottom // cell_size)
+    return Rect(left, top, right - left, bottom - top)
+
+
+def bounds(rects: Sequence[Rect], size: tuple[int, int], cell_size: int = walkable_mask_cell_size) -> Rect:
+    """Area covering the map and the rects, which may reach past its edges, starting on a cell edge"""
+    area = Rect((0, 0), size).unionall([Rect(rect) for rect in rects])
+    left = area.left // cell_size * cell_size
+    top = area.top // cell_size * cell_size
+    return Rect(left, top, area.right - left, area.bottom - top)
+
+
+def rasterize(rects: Sequence[Rect], area: Rect, cell_size: int = walkable_mask_cell_size) -> Mask:
+    """Mask of an area with the bits of every cell touched by the rects set
+
+    Args:
+        rects (Sequence[Rect]): Areas to set, in pixels
+        area (Rect): Area covered by the mask in pixels, its top left is bit (0, 0)
+        cell_size (int, optional): Pixels per bit, 1 matches the rects exactly. Defaults to walkable_mask_cell_size.
+
+    Returns:
+        Mask: One bit per cell
+    """
+    mask = Mask(to_cells(Rect((0, 0), area.size), cell_size).size)
+    for rect in rects:
+        cells = to_cells(Rect(rect).move(-area.left, -area.top), cell_size)
+        if cells.width > 0 and cells.height > 0:
+            mask.draw(filled_mask(cells.size), cells.topleft)
+    return mask
+
+
+def overlaps(mask: Mask, rect: Rect, cell_size: int = walkable_mask_cell_size) -> bool:
+    """Whether any bit of the cells touched by rect is set, a few bitwise operations in C"""
+    # Called for every move, the common one pixel cells skip the conversion
+    if cell_size != 1:
+        rect = to_cells(rect, cell_size)
+    size = rect.size
+    probe = _filled.get(size)
+    if probe is None:
+        probe = filled_mask(size)
+    return mask.overlap(probe, rect.topleft) is not None
+
+
+def _cache_path(image_file_name: str, size: tuple[int, int], cell_size: int, invert: bool) -> str:
+    key = f"{image_file_name}:{os.path.getmtime(image_file_name)}:{size}:{cell_size}:{invert}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(image_file_name))[0]
+    return os.path.join(walkable_mask_cache_dir, f"{name}-{digest}.png")
+
+
+def mask_from_image(image_file_name: str, size: tuple[int, int], cell_size: int = walkable_mask_cell_size,
+                    invert: bool = False, cache: bool = True) -> Mask:
+    """Mask of the blocked cells painted in an image
+
+    Opaque pixels are blocked, the image is stretched over the map. The mask
+    is saved to `walkable_mask_cache_dir` and loaded from there until the
+    image changes.
+
+    Args:
+        image_file_name (str): Image painted over the map
+        size (tuple[int, int]): Size of the map in pixels
+        cell_size (int, optional): Pixels per bit. Defaults to walkable_mask_cell_size.
+        invert (bool, optional): The opaque pixels are the walkable area instead. Defaults to False.
+        cache (bool, optional): Load and save the mask in the disk cache. Defaults to True.
+
+    Returns:
+        Mask: One bit per cell, set where blocked
+    """
+    path = _cache_path(image_file_name, size, cell_size, invert)
+    if cache and os.path.exists(path):
+        cached = pygame.image.load(path)
+        return pygame.mask.from_threshold(cached, (255, 255, 255), (1, 1, 1, 255))
+
+    cells = to_cells(Rect((0, 0), size), cell_size).size
+    image = pygame.image.load(image_file_name)
+    mask = pygame.mask.from_surface(pygame.transform.scale(image, cells))
+    if invert:
+        mask.invert()
+    if cache:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pygame.image.save(mask.to_surface(), path)
+        logger.debug(f"Cached the walkable mask of {image_file_name} in {path}")
+    return mask